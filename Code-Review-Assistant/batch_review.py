@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from connection import run_async
+from pipeline import SUPPORTED_EXTENSIONS, process_code_review
+from shared.ratelimit import BATCH, limiter, request_priority
+
+# Headless reviewer for whole directories, e.g. for nightly jobs:
+#   python batch_review.py path/to/repo --output reviews.jsonl --concurrency 4 --rpm 15
+# Re-running with the same --output skips files already reviewed unchanged.
+# Model calls go through the shared rate limiter at batch priority, so an
+# interactive user in the same process is always served first.
+
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "venv", ".venv", "__pycache__", "dist", "build", "target"}
+
+
+def find_code_files(root):
+    extensions = {f".{ext}" for ext in SUPPORTED_EXTENSIONS}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in extensions:
+                yield os.path.join(dirpath, filename)
+
+def load_finished(output_path):
+    # path -> sha256 of files that already have a successful review
+    finished = {}
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a run killed mid-write can leave a partial last line
+            if record.get("status") == "ok":
+                finished[record["path"]] = record["sha256"]
+    return finished
+
+async def review_directory(root, output_path, concurrency, incremental=False):
+    finished = load_finished(output_path)
+    queue = asyncio.Queue()
+    skipped = 0
+
+    for path in find_code_files(root):
+        relative = os.path.relpath(path, root)
+        with open(path, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+        if finished.get(relative) == sha256:
+            skipped += 1
+            continue
+        queue.put_nowait((path, relative, sha256))
+
+    counts = {"ok": 0, "error": 0}
+    started = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        def write(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        async def worker():
+            while not queue.empty():
+                path, relative, sha256 = queue.get_nowait()
+                record = {"path": relative, "sha256": sha256}
+                file_started = time.monotonic()
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        code_text = f.read()
+                    analysis, suggestions, documentation = await process_code_review(code_text, filename=relative, incremental=incremental)
+                    record.update(status="ok", analysis=analysis, suggestions=suggestions, documentation=documentation)
+                except Exception as e:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                record["seconds"] = round(time.monotonic() - file_started, 2)
+                counts[record["status"]] += 1
+                write(record)
+                print(f"[{record['status']}] {relative} ({record['seconds']}s)", flush=True)
+
+        with request_priority(BATCH):
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    elapsed = time.monotonic() - started
+    reviewed = counts["ok"] + counts["error"]
+    per_minute = reviewed / elapsed * 60 if elapsed else 0.0
+    print(
+        f"Reviewed {reviewed} files ({counts['ok']} ok, {counts['error']} failed, "
+        f"{skipped} already done) in {elapsed:.1f}s: {per_minute:.1f} files/minute"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Review every supported code file in a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--output", default="reviews.jsonl", help="JSONL file to append results to (default: reviews.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="files reviewed at the same time (default: 4)")
+    parser.add_argument("--rpm", type=float, help="model requests per minute (default: MODEL_RPM from .env)")
+    parser.add_argument("--tpm", type=float, help="model tokens per minute (default: MODEL_TPM from .env)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="review function by function, reusing cached results for unchanged functions",
+    )
+    args = parser.parse_args()
+
+    limiter.configure(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    run_async(review_directory(args.directory, args.output, args.concurrency, args.incremental))
+
+
+if __name__ == "__main__":
+    main()
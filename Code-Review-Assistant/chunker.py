@@ -0,0 +1,237 @@
+import ast
+import os
+import re
+
+from shared.tokens import estimate_tokens
+
+# ---------- SETTINGS ----------
+# File types the reviewer accepts, shared by the upload form and batch_review.py
+SUPPORTED_EXTENSIONS = ["py", "js", "java", "cpp", "c", "ts", "tsx", "jsx", "cs", "rb", "go", "rs", "php"]
+# Files larger than this (estimated tokens) are reviewed in parts
+CHUNK_TOKENS = int(os.getenv("REVIEW_CHUNK_TOKENS", "3000"))
+# Set REVIEW_INCREMENTAL=1 to review function by function by default (see pipeline.incremental_review)
+INCREMENTAL = os.getenv("REVIEW_INCREMENTAL", "0") == "1"
+
+BRACE_LANGUAGES = {"js", "java", "cpp", "c", "ts", "tsx", "jsx", "cs", "go", "rs", "php"}
+# "class Foo", "async def bar", "export function baz", "pub fn qux" at the start of a line
+NAME_RE = re.compile(
+    r"^[ \t]*(?:[\w@]+[ \t]+)*?(?:class|def|func|fn|function|interface|struct|enum|module|impl|trait)[ \t]+([A-Za-z_$][\w$]*)",
+    re.MULTILINE,
+)
+# A brace block whose header names a container rather than a function
+CONTAINER_RE = re.compile(r"\b(class|interface|struct|enum|namespace|impl|trait|module|object|record)\b[^()]*$")
+# The function name in a C-style signature: the last "name(" before the body
+SIGNATURE_RE = re.compile(r"([A-Za-z_$~][\w$:~]*)\s*\(")
+NOT_NAMES = {"if", "for", "while", "switch", "catch", "return", "sizeof", "new"}
+# Strings and comments are blanked out before counting braces
+STRING_OR_COMMENT_RE = re.compile(r'//.*|/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`')
+
+
+# ---------- UNITS ----------
+# A unit is (start, end): 1-based inclusive line numbers of one top-level
+# definition (or, with nested, one method), together with any comments or
+# statements just before it.
+
+def python_units(lines, nested=False):
+    # nested: methods start units of their own. A class header with nothing
+    # but a docstring stays with the first method rather than cost a call.
+    def starts_of(nodes, owner=None):
+        starts = []
+        for index, node in enumerate(nodes):
+            if owner:
+                if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    continue
+                if index == (1 if ast.get_docstring(owner) else 0):
+                    continue
+            decorators = getattr(node, "decorator_list", [])
+            starts.append(min([node.lineno] + [d.lineno for d in decorators]))
+            if nested and isinstance(node, ast.ClassDef):
+                starts.extend(starts_of(node.body, node))
+        return starts
+
+    tree = ast.parse("\n".join(lines))
+    return units_from_starts(starts_of(tree.body), len(lines))
+
+def code_lines(lines):
+    # Each line with strings and comments blanked out
+    in_block_comment = False
+    for line in lines:
+        code = line
+        if in_block_comment:
+            if "*/" not in code:
+                yield ""
+                continue
+            code = code.split("*/", 1)[1]
+            in_block_comment = False
+        code = STRING_OR_COMMENT_RE.sub("", code)
+        if "/*" in code:
+            code = code.split("/*", 1)[0]
+            in_block_comment = True
+        yield code
+
+def brace_units(lines, nested=False):
+    # A unit ends on the line where the brace depth drops back to zero. With
+    # nested, the body of a class, struct, namespace and the like is split
+    # the same way, each member a unit; the header joins the first one.
+    units, start, depth = [], 1, 0
+    containers = []  # line numbers where the open containers began
+    for number, code in enumerate(code_lines(lines), 1):
+        opened = code.count("{")
+        opened_container = closed_container = header_pending = False
+        for position, char in enumerate(code):
+            if char == "{":
+                depth += 1
+                header = " ".join(code_lines(lines[start - 1:number - 1])) + " " + code[:position]
+                if nested and depth == len(containers) + 1 and CONTAINER_RE.search(header):
+                    containers.append(number)
+                    opened_container = True
+            elif char == "}":
+                depth = max(depth - 1, 0)
+                if depth < len(containers):
+                    closed_container = True
+                    # An empty container, or one on a single line, is a unit of its own
+                    header_pending = containers.pop() >= start
+        if closed_container and units and not header_pending:
+            # The container's closing brace joins its last member
+            units[-1] = (units[-1][0], number)
+            start = number + 1
+        elif closed_container or (
+            depth == len(containers) and not opened_container and (opened or code.strip().endswith((";", "}")))
+        ):
+            units.append((start, number))
+            start = number + 1
+    if start <= len(lines):
+        units.append((start, len(lines)))
+    return units
+
+def indent_units(lines):
+    # Ruby and anything that fails to parse: a new unit starts at each
+    # unindented line that isn't a closing keyword or bracket
+    starts = [
+        number for number, line in enumerate(lines, 1)
+        if line.strip() and not line[0].isspace() and not re.match(r"(end\b|[}\])]|else\b|elif\b|except\b|finally\b)", line)
+    ]
+    return units_from_starts(starts, len(lines))
+
+def units_from_starts(starts, line_count):
+    starts = sorted(set(starts) | {1})
+    ends = [start - 1 for start in starts[1:]] + [line_count]
+    return [(start, end) for start, end in zip(starts, ends) if start <= end]
+
+def find_units(lines, extension, nested=False):
+    if extension == "py":
+        try:
+            return python_units(lines, nested)
+        except SyntaxError:
+            return indent_units(lines)
+    if extension in BRACE_LANGUAGES:
+        return brace_units(lines, nested)
+    return indent_units(lines)
+
+def unit_name(text, extension):
+    # "class Foo", "def bar" and friends; in brace languages, otherwise the
+    # function name before the first "{" (C has no keyword to go by)
+    if extension in BRACE_LANGUAGES:
+        code = " ".join(code_lines(text.splitlines()))
+        if "{" in code:
+            header = code.split("{", 1)[0]
+            names = [name for name in SIGNATURE_RE.findall(header) if name not in NOT_NAMES]
+            if names and not CONTAINER_RE.search(header):
+                return names[-1]
+    match = NAME_RE.search(text)
+    return match.group(1) if match else ""
+
+
+# ---------- CHUNKS ----------
+def split_unit(lines, start, end, max_tokens):
+    # A single definition bigger than the budget: split it by lines
+    pieces, piece_start, size = [], start, 0
+    for number in range(start, end + 1):
+        line_tokens = estimate_tokens(lines[number - 1])
+        if size and size + line_tokens > max_tokens:
+            pieces.append((piece_start, number - 1))
+            piece_start, size = number, 0
+        size += line_tokens
+    pieces.append((piece_start, end))
+    return pieces
+
+def review_units(code_text, filename="", max_tokens=CHUNK_TOKENS):
+    # One entry per function, method or class header, for incremental
+    # reviews. Imports,
+    # constants and comments between definitions are attached to the next
+    # definition, so each unit is worth a model call. Same dict shape as chunk_code.
+    lines = code_text.splitlines()
+    if not lines:
+        return []
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    units = []
+    pending_start = None
+    for start, end in find_units(lines, extension, nested=True):
+        if estimate_tokens("\n".join(lines[start - 1:end])) > max_tokens:
+            pieces = split_unit(lines, start, end, max_tokens)
+        else:
+            pieces = [(start, end)]
+        for piece_start, piece_end in pieces:
+            name = unit_name("\n".join(lines[piece_start - 1:piece_end]), extension)
+            if not name:
+                pending_start = pending_start or piece_start
+                continue
+            unit_start = pending_start or piece_start
+            pending_start = None
+            units.append({
+                "file": filename,
+                "start": unit_start,
+                "end": piece_end,
+                "name": name,
+                "text": "\n".join(lines[unit_start - 1:piece_end]),
+            })
+    if pending_start:
+        # Trailing code after the last definition
+        if units:
+            units[-1]["end"] = len(lines)
+            units[-1]["text"] = "\n".join(lines[units[-1]["start"] - 1:])
+        else:
+            units.append({"file": filename, "start": 1, "end": len(lines), "name": "", "text": code_text})
+    return units
+
+def chunk_code(code_text, filename="", max_tokens=CHUNK_TOKENS):
+    # Splits code into chunks of whole top-level definitions, each at most
+    # about max_tokens. Returns a list of dicts with file, start, end (line
+    # numbers), name (the definitions it covers) and text. Small files come
+    # back as one chunk.
+    lines = code_text.splitlines()
+    if estimate_tokens(code_text) <= max_tokens or len(lines) < 2:
+        return [{"file": filename, "start": 1, "end": len(lines), "name": "", "text": code_text}]
+
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    units = []
+    for start, end in find_units(lines, extension):
+        if estimate_tokens("\n".join(lines[start - 1:end])) > max_tokens:
+            units.extend(split_unit(lines, start, end, max_tokens))
+        else:
+            units.append((start, end))
+
+    # Pack neighbouring units into chunks up to the budget
+    chunks, current, size = [], [], 0
+    for start, end in units:
+        unit_tokens = estimate_tokens("\n".join(lines[start - 1:end]))
+        if current and size + unit_tokens > max_tokens:
+            chunks.append(current)
+            current, size = [], 0
+        current.append((start, end))
+        size += unit_tokens
+    if current:
+        chunks.append(current)
+
+    result = []
+    for group in chunks:
+        start, end = group[0][0], group[-1][1]
+        text = "\n".join(lines[start - 1:end])
+        names = []
+        for unit_start, unit_end in group:
+            unit = unit_name("\n".join(lines[unit_start - 1:unit_end]), extension)
+            if unit and unit not in names:
+                names.append(unit)
+        name = ", ".join(names[:3]) + (", ..." if len(names) > 3 else "")
+        result.append({"file": filename, "start": start, "end": end, "name": name, "text": text})
+    return result
@@ -1,103 +1,71 @@
 import streamlit as st
-import asyncio
-import re
-from agents import Agent, Runner
-from connection import config
+from connection import preload, run_job, restore_session, save_session
+from chunker import INCREMENTAL, SUPPORTED_EXTENSIONS
 
-# ---------- AGENTS ----------
-analyzer_agent = Agent(
-    name="Analyzer Agent",
-    instructions="""
-    You're a code review assistant. Analyze the given code in any programming language and identify issues such as:
-    - Syntax errors
-    - Poor code structure
-    - Bad naming conventions
-    - Missing comments or documentation
-
-    Output a structured list of problems you detect.
-    """
-)
-
-suggestion_agent = Agent(
-    name="Suggestion Agent",
-    instructions="""
-    You receive a list of code issues from the Analyzer Agent.
-    For each issue, suggest improvements or fixes in bullet points.
-    Provide actionable advice, applicable to the language used.
-    """
-)
-
-documentation_agent = Agent(
-    name="Documentation Agent",
-    instructions="""
-    Your task is to generate documentation or comments for the given code, regardless of the programming language.
-    Include:
-    - Function/class/module descriptions
-    - Optional README-style summary
-
-    Format the output in markdown.
-    """
-)
+preload("pipeline")
 
 # ---------- PAGE CONFIG ----------
 st.set_page_config(page_title="🧑‍💻 Code Review Assistant", layout="centered")
 st.title("🧑‍💻 Code Review Assistant")
 st.caption("Upload a code file and let AI help you review and document it.")
 
+# The last review survives refreshes and reconnects (see ?sid= in the URL)
+restore_session()
+
 # ---------- FILE UPLOAD ----------
 with st.form("code_review_form"):
     uploaded_file = st.file_uploader(
         "📎 Upload Code File",
-        type=["py", "js", "java", "cpp", "c", "ts", "tsx", "jsx", "cs", "rb", "go", "rs", "php"]
+        type=SUPPORTED_EXTENSIONS
     )
+    incremental = st.checkbox("♻️ Only re-review changed functions", value=INCREMENTAL)
     submitted = st.form_submit_button("🔍 Review Code")
 
 # ---------- UTILS ----------
 def extract_code_text(file):
     return file.read().decode("utf-8")
 
-async def process_code_review(code_text):
-    # Step 1: Analyze
-    analysis = await Runner.run(
-        starting_agent=analyzer_agent,
-        input=[{"role": "user", "content": code_text}],
-        run_config=config,
-    )
-
-    # Step 2: Suggest Improvements
-    suggestions = await Runner.run(
-        starting_agent=suggestion_agent,
-        input=[{"role": "user", "content": analysis.final_output}],
-        run_config=config,
-    )
+def open_panels():
+    panels = {}
+    with st.expander("🕵️ Code Analysis (Issues Found)", expanded=True):
+        panels["analysis"] = st.empty()
 
-    # Step 3: Generate Documentation
-    documentation = await Runner.run(
-        starting_agent=documentation_agent,
-        input=[{"role": "user", "content": code_text}],
-        run_config=config,
-    )
+    with st.expander("💡 Suggestions for Improvement", expanded=True):
+        panels["suggestions"] = st.empty()
 
-    return analysis.final_output, suggestions.final_output, documentation.final_output
+    with st.expander("📄 Auto-generated Documentation", expanded=True):
+        panels["documentation"] = st.empty()
+    return panels
 
 # ---------- MAIN ----------
 if submitted:
     if uploaded_file:
         code_text = extract_code_text(uploaded_file)
 
-        with st.spinner("🤖 Reviewing your code..."):
-            analysis, suggestions, documentation = asyncio.run(process_code_review(code_text))
+        panels = open_panels()
+        for panel in panels.values():
+            panel.info("🤖 Reviewing your code...")
 
-        st.success("✅ Code Review Complete!")
-
-        with st.expander("🕵️ Code Analysis (Issues Found)", expanded=True):
-            st.markdown(analysis)
+        def show_result(key, output):
+            panels[key].markdown(output)
 
-        with st.expander("💡 Suggestions for Improvement", expanded=True):
-            st.markdown(suggestions)
+        review = run_job(
+            "review",
+            {"code": code_text, "filename": uploaded_file.name, "incremental": incremental},
+            on_text=show_result,
+        )
+        for key, panel in panels.items():
+            panel.markdown(review[key])
+        save_session(review={"file": uploaded_file.name, **review})
 
-        with st.expander("📄 Auto-generated Documentation", expanded=True):
-            st.markdown(documentation)
+        st.success("✅ Code Review Complete!")
 
     else:
-        st.error("⚠️ Please upload a code file to review.")
\ No newline at end of file
+        st.error("⚠️ Please upload a code file to review.")
+
+# ---------- LAST REVIEW ----------
+elif st.session_state.get("review"):
+    review = st.session_state.review
+    st.caption(f"Last review: {review['file']}")
+    for key, panel in open_panels().items():
+        panel.markdown(review[key])
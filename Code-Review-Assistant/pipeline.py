@@ -0,0 +1,301 @@
+import asyncio
+import os
+import re
+from agents import Agent
+from pydantic import BaseModel
+from connection import config, dispatch, run_agent, agent_cache
+from chunker import INCREMENTAL, SUPPORTED_EXTENSIONS, chunk_code, review_units
+from shared.cache import AgentCache
+from shared.jobs import JOBS_PATH
+from shared.models import model_registry
+from shared.output_schema import RepairingOutputSchema
+from shared.tokens import token_budget
+
+# Most chunk reviews of one large file in flight at once
+MAX_PARALLEL_CHUNKS = int(os.getenv("REVIEW_MAX_PARALLEL", "4"))
+# Incremental reviews of single functions are kept in their own SQLite file,
+# next to the job queue, so every worker process and restart reuses them
+UNIT_CACHE_PATH = os.getenv(
+    "REVIEW_UNIT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(JOBS_PATH)), "unit_reviews.db")
+)
+UNIT_CACHE_TTL = float(os.getenv("REVIEW_UNIT_CACHE_TTL", str(30 * 24 * 3600)))
+UNIT_CACHE_MAX_ENTRIES = int(os.getenv("REVIEW_UNIT_CACHE_MAX_ENTRIES", "50000"))
+
+# ---------- AGENTS ----------
+analyzer_agent = Agent(
+    name="Analyzer Agent",
+    instructions="""
+    You're a code review assistant. Analyze the given code in any programming language and identify issues such as:
+    - Syntax errors
+    - Poor code structure
+    - Bad naming conventions
+    - Missing comments or documentation
+
+    Output a structured list of problems you detect.
+    """
+)
+
+suggestion_agent = Agent(
+    name="Suggestion Agent",
+    instructions="""
+    You receive a list of code issues from the Analyzer Agent.
+    For each issue, suggest improvements or fixes in bullet points.
+    Provide actionable advice, applicable to the language used.
+    """
+)
+
+documentation_agent = Agent(
+    name="Documentation Agent",
+    instructions="""
+    Your task is to generate documentation or comments for the given code, regardless of the programming language.
+    Include:
+    - Function/class/module descriptions
+    - Optional README-style summary
+
+    Format the output in markdown.
+    """
+)
+
+class UnitReview(BaseModel):
+    issues: list[str]
+    suggestions: list[str]
+    documentation: str
+
+# Incremental mode: one combined call per function or class
+unit_review_agent = Agent(
+    name="Unit Review Agent",
+    instructions="""
+    You review one function, class or block taken from a larger code file. It may use names defined elsewhere in the file; don't report those as missing.
+
+    Return:
+    - issues: problems such as syntax errors, poor code structure, bad naming conventions, missing comments or documentation. Leave empty if there are none.
+    - suggestions: actionable improvements or fixes for those issues, applicable to the language used.
+    - documentation: a short markdown description of what this code does.
+    """,
+    output_type=RepairingOutputSchema(UnitReview),
+)
+
+# Reviews of an unchanged file stay valid for a long time
+agent_cache.set_ttl(analyzer_agent.name, 24 * 3600)
+agent_cache.set_ttl(suggestion_agent.name, 24 * 3600)
+agent_cache.set_ttl(documentation_agent.name, 7 * 24 * 3600)
+unit_cache = AgentCache(path=UNIT_CACHE_PATH, disk_max_entries=UNIT_CACHE_MAX_ENTRIES)
+unit_cache.set_ttl(unit_review_agent.name, UNIT_CACHE_TTL)
+
+# Input caps in tokens (see shared/tokens.py). Chunks are at most
+# REVIEW_CHUNK_TOKENS, so the analyzer's cap only catches code the chunker
+# can't split. Documentation needs signatures and docstrings more than bodies,
+# so it gets a smaller cap: over it, each definition keeps its signature and
+# first lines.
+token_budget.set_cap(analyzer_agent.name, 4000)
+token_budget.set_cap(documentation_agent.name, 2000)
+token_budget.set_cap(suggestion_agent.name, 3000)
+# These read the uploaded code, where spacing inside a line can matter
+token_budget.set_code(analyzer_agent.name)
+token_budget.set_code(documentation_agent.name)
+token_budget.set_code(unit_review_agent.name)
+
+# Model tiers (see shared/models.py). Finding the issues is the hard part of a
+# review, so the analyzer and the combined unit reviewer get the strong tier.
+model_registry.set_tier(analyzer_agent.name, "strong")
+model_registry.set_tier(unit_review_agent.name, "strong")
+
+# ---------- PIPELINE ----------
+async def run_pipeline(steps, on_result=None, on_text=None):
+    # Each step is (key, run, depends_on, build_input), where run(input, on_text)
+    # is a coroutine. A step starts as soon as the steps it depends on have
+    # finished, so independent ones run together.
+    # on_text(key, text) receives streamed tokens, on_result(key, output) the final output.
+    tasks = {}
+
+    async def run_step(key, run, depends_on, build_input):
+        deps = [await tasks[dep] for dep in depends_on]
+        stream_to = (lambda text: on_text(key, text)) if on_text else None
+        output = await run(build_input(*deps), stream_to)
+        if on_result:
+            # Callbacks touch the UI, so they run on the Streamlit script thread
+            dispatch(on_result, key, output)
+        return output
+
+    for key, run, depends_on, build_input in steps:
+        tasks[key] = asyncio.ensure_future(run_step(key, run, depends_on, build_input))
+
+    outputs = await asyncio.gather(*tasks.values())
+    return dict(zip(tasks.keys(), outputs))
+
+def single_call(agent):
+    async def run(text, on_text=None):
+        return await run_agent(agent, [{"role": "user", "content": text}], config, on_text=on_text)
+    return run
+
+def per_chunk(agent, merge, semaphore):
+    # Runs agent on every chunk (at most `semaphore` at a time) and merges the
+    # outputs in file order. While chunks finish, on_text gets them joined.
+    async def run(chunks, on_text=None):
+        streamed = [""] * len(chunks)
+
+        def stream(i):
+            if not on_text:
+                return None
+            def update(text):
+                streamed[i] = text
+                on_text("\n\n".join(part for part in streamed if part))
+            return update
+
+        async def run_chunk(i, chunk):
+            async with semaphore:
+                return await run_agent(
+                    agent,
+                    [{"role": "user", "content": chunk_prompt(chunk, i, len(chunks))}],
+                    config,
+                    on_text=stream(i),
+                )
+
+        outputs = await asyncio.gather(*(run_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        return merge(chunks, outputs)
+    return run
+
+def chunk_prompt(chunk, i, count):
+    return f"Part {i + 1} of {count} of {chunk['file'] or 'the file'}, lines {chunk['start']}-{chunk['end']}:\n\n{chunk['text']}"
+
+# ---------- MERGING ----------
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*\S)")
+LINE_REF_RE = re.compile(r"\blines?\s+(\d+)(?:\s*[-–]\s*(\d+))?")
+
+def issue_key(text, where):
+    # An issue repeats only at the same place: the lines it names, else
+    # `where`, the chunk or unit it was reported for. "Missing docstring" for
+    # two functions is two issues; "**Naming**: `x` is unclear (line 12)" and
+    # "Naming: x is unclear (line 12)" from two chunks are one.
+    text = text.lower()
+    lines = tuple(LINE_REF_RE.findall(text))
+    words = " ".join(re.findall(r"[a-z0-9_]+", LINE_REF_RE.sub("", text)))
+    return (lines or where, words) if words else None
+
+def chunk_heading(chunk):
+    return f"**Lines {chunk['start']}-{chunk['end']}**" + (f" ({chunk['name']})" if chunk["name"] else "")
+
+def merge_issues(chunks, outputs):
+    # One section per chunk; list items already reported for the same lines are dropped
+    seen = set()
+    sections = []
+    for chunk, output in zip(chunks, outputs):
+        items = []
+        found_list = False
+        for line in output.splitlines():
+            match = LIST_ITEM_RE.match(line)
+            if not match:
+                continue
+            found_list = True
+            key = issue_key(match.group(1), (chunk["start"], chunk["end"]))
+            if key and key not in seen:
+                seen.add(key)
+                items.append(line.rstrip())
+        if not found_list:
+            items = [output.strip()]
+        if items:
+            sections.append(chunk_heading(chunk) + "\n" + "\n".join(items))
+    return "\n\n".join(sections)
+
+def merge_documentation(chunks, outputs):
+    return "\n\n".join(output.strip() for output in outputs)
+
+def merge_lists(units, lists, empty):
+    # Like merge_issues, for the list fields of UnitReview: a finding repeated
+    # for another function stays, one repeated within a function goes
+    seen = set()
+    sections = []
+    for unit, items in zip(units, lists):
+        kept = []
+        for item in items:
+            key = issue_key(item, (unit["start"], unit["end"]))
+            if key and key not in seen:
+                seen.add(key)
+                kept.append(f"- {item.strip()}")
+        if kept:
+            sections.append(chunk_heading(unit) + "\n" + "\n".join(kept))
+    return "\n\n".join(sections) or empty
+
+# ---------- INCREMENTAL REVIEW ----------
+def unit_input(unit):
+    # Only the code and its language: a function that merely moved, or whose
+    # neighbours changed, produces the same input and so hits the agent cache
+    language = os.path.splitext(unit["file"])[1].lstrip(".") or "unknown"
+    code = "\n".join(line.rstrip() for line in unit["text"].strip("\n").splitlines())
+    return f"Language: {language}\n\n{code}"
+
+def merge_reviews(units, reviews):
+    # Report sections for the units reviewed so far (None = still running)
+    done = [(unit, r) for unit, r in zip(units, reviews) if r is not None]
+    return {
+        "analysis": merge_lists([u for u, _ in done], [r.issues for _, r in done], "No issues found."),
+        "suggestions": merge_lists([u for u, _ in done], [r.suggestions for _, r in done], "No suggestions."),
+        "documentation": "\n\n".join(f"{chunk_heading(unit)}\n{r.documentation.strip()}" for unit, r in done),
+    }
+
+async def incremental_review(code_text, filename="", on_result=None, on_text=None):
+    # Reviews each function or method with one structured call. Results are
+    # kept in unit_cache by the unit's content, so re-uploading a file after a
+    # small edit only sends the changed functions to the model; the rest of
+    # the report is reassembled from earlier fragments. on_text(key, text)
+    # gets the report so far each time a unit finishes.
+    units = review_units(code_text, filename)
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_CHUNKS)
+    reviews = [None] * len(units)
+
+    async def review(i, unit):
+        async with semaphore:
+            reviews[i] = await run_agent(
+                unit_review_agent, [{"role": "user", "content": unit_input(unit)}], config, cache=unit_cache,
+            )
+        if on_text:
+            for key, text in merge_reviews(units, reviews).items():
+                dispatch(on_text, key, text)
+
+    await asyncio.gather(*(review(i, unit) for i, unit in enumerate(units)))
+    outputs = merge_reviews(units, reviews)
+    if on_result:
+        for key, output in outputs.items():
+            dispatch(on_result, key, output)
+    return outputs["analysis"], outputs["suggestions"], outputs["documentation"]
+
+async def process_code_review(code_text, on_result=None, on_text=None, filename="", incremental=INCREMENTAL):
+    # Large files are split on function/class boundaries (see chunker.py); the
+    # analyzer and documentation agents then run per chunk in parallel.
+    if incremental:
+        return await incremental_review(code_text, filename, on_result, on_text)
+
+    chunks = chunk_code(code_text, filename)
+
+    if len(chunks) == 1:
+        analyze, document = single_call(analyzer_agent), single_call(documentation_agent)
+        review_input = lambda: code_text
+    else:
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_CHUNKS)
+        analyze = per_chunk(analyzer_agent, merge_issues, semaphore)
+        document = per_chunk(documentation_agent, merge_documentation, semaphore)
+        review_input = lambda: chunks
+
+    steps = [
+        # Step 1: Analyze
+        ("analysis", analyze, [], review_input),
+        # Step 2: Suggest Improvements (needs the analysis)
+        ("suggestions", single_call(suggestion_agent), ["analysis"], lambda analysis: analysis),
+        # Step 3: Generate Documentation (only needs the code, runs alongside 1 -> 2)
+        ("documentation", document, [], review_input),
+    ]
+    outputs = await run_pipeline(steps, on_result, on_text)
+    return outputs["analysis"], outputs["suggestions"], outputs["documentation"]
+
+# ---------- JOBS ----------
+async def review_job(input, on_text=None):
+    analysis, suggestions, documentation = await process_code_review(
+        input["code"],
+        on_result=on_text,
+        on_text=on_text,
+        filename=input.get("filename", ""),
+        incremental=input.get("incremental", INCREMENTAL),
+    )
+    return {"analysis": analysis, "suggestions": suggestions, "documentation": documentation}
+
+JOB_HANDLERS = {"review": review_job}
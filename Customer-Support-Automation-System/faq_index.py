@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# ---------- SETTINGS ----------
+DATA_PATH = os.getenv(
+    "SUPPORT_DATA_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "support_data.json"),
+)
+# Minimum confidence (0-1) for answering straight from the data file
+CONFIDENCE_THRESHOLD = float(os.getenv("FAQ_CONFIDENCE_THRESHOLD", "0.6"))
+# The best entry must beat the runner-up by this much, otherwise the query is ambiguous
+CONFIDENCE_MARGIN = float(os.getenv("FAQ_CONFIDENCE_MARGIN", "0.15"))
+
+# English and Roman Urdu filler words that carry no meaning for matching
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "for", "in", "on", "at", "by",
+    "and", "or", "do", "does", "did", "can", "could", "i", "me", "my", "you", "your", "we",
+    "it", "this", "that", "what", "how", "when", "which", "will", "would", "please", "with",
+    "hai", "hain", "ho", "ka", "ki", "ke", "ko", "se", "mein", "main", "mai", "kya", "kaise",
+    "ye", "yeh", "wo", "woh", "aap", "ap", "mujhe", "mera", "meri", "hum", "tha", "thi", "bhi",
+    "sakta", "sakti", "sakte", "karna", "kar", "hoga", "hogi", "na", "ne", "batao", "bataein",
+    "kab", "tak", "milta", "milti", "milega", "milegi", "milenge", "gaya", "gayi",
+    "have", "has", "get", "any", "there", "if", "from", "about", "take", "accept",
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        # Crude plural folding: "returns" -> "return", "days" -> "day"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    # Adjacent pairs let phrases like "cash on delivery" outrank a lone "delivery"
+    return tokens + [f"{first}_{second}" for first, second in zip(tokens, tokens[1:])]
+
+
+class FaqIndex:
+    # Token-level inverted index with BM25 scoring over question + keywords
+
+    def __init__(self, entries, k1=1.5, b=0.75):
+        self.entries = entries
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(entry_id, term_frequency)]
+        self.lengths = []
+
+        for entry_id, entry in enumerate(entries):
+            text = " ".join([entry["question"], *entry.get("keywords", [])])
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((entry_id, tf))
+
+        total = len(entries)
+        self.avg_length = (sum(self.lengths) / total) if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+        self.unseen_idf = math.log(1 + (total + 0.5) / 0.5)
+        # Score of each entry's own question, used to turn BM25 into a 0-1 confidence
+        self.question_scores = [
+            self._scores(tokenize(entry["question"])).get(entry_id, 0.0)
+            for entry_id, entry in enumerate(entries)
+        ]
+
+    @classmethod
+    def from_file(cls, path, section):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)[section])
+
+    def _scores(self, terms, best=None):
+        # best, if given, collects the highest score each known term reaches
+        scores = defaultdict(float)
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for entry_id, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[entry_id] / self.avg_length
+                term_score = idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                scores[entry_id] += term_score
+                if best is not None:
+                    best[term] = max(best.get(term, 0.0), term_score)
+        return scores
+
+    def search(self, query, top_k=3):
+        # Returns [(confidence, entry)] best first. Confidence is 1.0 when an
+        # entry matches either its whole question or every query term. Words
+        # the index has never seen ("samsung", "installments") still count
+        # against it, each as much as the rarest known word, so a query about
+        # something else doesn't match on its one familiar word.
+        terms = tokenize(query)
+        best = {}
+        scores = self._scores(terms, best)
+        unknown = {term for term in terms if "_" not in term and term not in self.idf}
+        unknown_score = len(unknown) * self.unseen_idf
+        query_score = sum(best.values())
+        results = []
+        for entry_id, score in scores.items():
+            confidence = min(1.0, score / (min(self.question_scores[entry_id], query_score) + unknown_score))
+            results.append((confidence, entry_id))
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return [(confidence, self.entries[entry_id]) for confidence, entry_id in results[:top_k]]
+
+    def answer(self, query, threshold=CONFIDENCE_THRESHOLD, margin=CONFIDENCE_MARGIN):
+        results = self.search(query, top_k=2)
+        if not results or results[0][0] < threshold:
+            return None
+        if len(results) > 1 and results[0][0] - results[1][0] < margin:
+            return None
+        return results[0][1]["answer"]
+
+
+faq_index = FaqIndex.from_file(DATA_PATH, "faq")
+return_policy_index = FaqIndex.from_file(DATA_PATH, "return_policy")
+
+
+if __name__ == "__main__":
+    # Regression check: python faq_index.py [cases.json]
+    # Each case is [query, expected question], with null for queries that
+    # must go to the agents instead of being answered locally.
+    import sys
+
+    cases_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_cases.json")
+    with open(cases_path, encoding="utf-8") as f:
+        cases = json.load(f)
+    failed = 0
+    for section, index in (("faq", faq_index), ("return_policy", return_policy_index)):
+        answers = {entry["answer"]: entry["question"] for entry in index.entries}
+        for query, expected in cases.get(section, []):
+            got = answers.get(index.answer(query))
+            if got != expected:
+                failed += 1
+                print(f"FAIL {section}: {query!r} -> {got!r}, expected {expected!r}")
+    print(f"{failed} failed")
+    sys.exit(1 if failed else 0)
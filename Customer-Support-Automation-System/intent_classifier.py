@@ -0,0 +1,53 @@
+import csv
+import math
+import os
+from collections import Counter, defaultdict
+
+from faq_index import tokenize
+
+# ---------- SETTINGS ----------
+TRAINING_PATH = os.getenv(
+    "INTENT_TRAINING_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.csv"),
+)
+# Below this probability the query goes to the LLM router (inquiry_agent)
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+
+
+class IntentClassifier:
+    # Multinomial naive Bayes over the same tokens as the FAQ index
+
+    def __init__(self, examples, smoothing=1.0):
+        self.smoothing = smoothing
+        self.label_counts = Counter()
+        self.term_counts = defaultdict(Counter)
+        for text, label in examples:
+            self.label_counts[label] += 1
+            self.term_counts[label].update(tokenize(text))
+
+        self.vocabulary = set().union(*self.term_counts.values()) if self.term_counts else set()
+        total = sum(self.label_counts.values())
+        self.log_priors = {label: math.log(count / total) for label, count in self.label_counts.items()}
+        self.totals = {label: sum(counts.values()) for label, counts in self.term_counts.items()}
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls((row["text"], row["label"]) for row in csv.DictReader(f))
+
+    def predict(self, text):
+        # Returns (label, probability)
+        terms = [term for term in tokenize(text) if term in self.vocabulary]
+        size = len(self.vocabulary)
+        scores = {}
+        for label, log_prior in self.log_priors.items():
+            denominator = self.totals[label] + self.smoothing * size
+            scores[label] = log_prior + sum(
+                math.log((self.term_counts[label][term] + self.smoothing) / denominator) for term in terms
+            )
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+
+intent_classifier = IntentClassifier.from_file(TRAINING_PATH)
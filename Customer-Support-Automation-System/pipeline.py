@@ -0,0 +1,192 @@
+import asyncio
+import os
+from typing import Literal
+from agents import Agent
+from pydantic import BaseModel
+from connection import config, run_agent, dispatch
+from faq_index import DATA_PATH, STOPWORDS, faq_index, return_policy_index
+from intent_classifier import TRAINING_PATH, intent_classifier, CONFIDENCE_THRESHOLD as INTENT_CONFIDENCE_THRESHOLD
+from shared.models import model_registry
+from shared.output_schema import RepairingOutputSchema
+from shared.ratelimit import EXPECTED_OUTPUT_TOKENS
+from shared.semantic_cache import SemanticCache
+from shared.tokens import estimate_tokens
+
+# ---------- SETTINGS ----------
+# Set SUPPORT_SPECULATE=1 to start the likely follow-up agent (returns or
+# escalation) at the same time as the inquiry agent instead of after it
+SPECULATE = os.getenv("SUPPORT_SPECULATE", "0") == "1"
+# Intent probability needed to speculate (confident intents skip the inquiry agent entirely)
+SPECULATE_MIN_CONFIDENCE = float(os.getenv("SUPPORT_SPECULATE_MIN_CONFIDENCE", "0.4"))
+# Most tokens one query may spend on speculative runs
+SPECULATIVE_TOKENS = int(os.getenv("SUPPORT_SPECULATIVE_TOKENS", "1500"))
+
+# Agent answers reused for paraphrased queries; emptied when the FAQ data or
+# the intent examples change. Its longer stopword list keeps different
+# questions further apart, so it can use a lower threshold than the default
+# (checked with bench/semantic_eval.py).
+answer_cache = SemanticCache(
+    "Support Answers", sources=[DATA_PATH, TRAINING_PATH], stopwords=STOPWORDS, threshold=0.7,
+)
+
+# ---------- MANUAL TOOLS ----------
+# FAQ and return-policy entries live in support_data.json and are served from
+# a BM25 index; anything below the confidence threshold goes to the agents.
+def search_faq(query):
+    answer = faq_index.answer(query)
+    if answer:
+        return answer
+    return "Maaf kijiye, mujhe is sawal ka jawab nahi mila FAQ mein."
+
+def search_return_policy(query):
+    answer = return_policy_index.answer(query)
+    if answer:
+        return answer
+    return "Return policy mein yeh specific information nahi mili."
+
+# ---------- AGENTS ----------
+class InquiryRoute(BaseModel):
+    # The inquiry agent's decision; answer is only read for action="answer"
+    # and faq_query only for action="search_faq"
+    action: Literal["answer", "search_faq", "escalate_to_returns", "escalate_to_human"]
+    faq_query: str
+    answer: str
+
+inquiry_agent = Agent(
+    name="Inquiry Agent",
+    instructions="""
+    Tum ek helpful customer support agent ho. Tumhara kaam user ke general sawalon ka jawab dena hai — jaise delivery time, product availability, payment options, etc.
+
+    action chuno:
+    - `answer`: agar tum khud jawab de sakte ho; jawab `answer` mein likho.
+    - `search_faq`: agar FAQ mein dekhna behtar hai; short search query `faq_query` mein likho.
+    - `escalate_to_returns`: agar user return se related kuch bole.
+    - `escalate_to_human`: agar question complicated ho ya unclear ho.
+    Jo field use nahi ho rahi use "" chhod do.
+    """,
+    output_type=RepairingOutputSchema(InquiryRoute),
+)
+
+returns_agent = Agent(
+    name="Returns Agent",
+    instructions="""
+    Tum ek returns specialist ho. User agar return initiate karna chahta hai to tum uski order details maangte ho
+    aur return policy ke file se guide karte ho. Agar issue unclear ho to Escalation Agent ko forward karo with keyword `escalate_to_human`.
+    """
+)
+
+escalation_agent = Agent(
+    name="Escalation Agent",
+    instructions="""
+    Tum human-like agent ho jo mushkil ya unclear queries handle karta hai. Tum response draft karte ho jise human staff review karega.
+    Tum Inquiry ya Returns Agent se aane wale complex sawalon ke liye use hote ho.
+    """
+)
+
+# Model tiers (see shared/models.py). Routing is a small structured decision:
+# the fast tier, moving up when the route fails validation. Escalation drafts
+# are the hard cases and go to the strong tier.
+model_registry.set_tier(inquiry_agent.name, "fast")
+model_registry.set_tier(escalation_agent.name, "strong")
+
+# ---------- SPECULATION ----------
+def start_speculation(query, intent, confidence):
+    # Returns (agent, task) for the agent the inquiry agent will probably hand
+    # off to, already running, or None. Speculation is skipped when its
+    # estimated cost doesn't fit the per-query token budget.
+    if not SPECULATE or confidence < SPECULATE_MIN_CONFIDENCE:
+        return None
+    agent = {"returns": returns_agent, "human": escalation_agent}.get(intent)
+    if agent is None:
+        return None
+    if estimate_tokens(agent.instructions, query) + EXPECTED_OUTPUT_TOKENS > SPECULATIVE_TOKENS:
+        return None
+    task = asyncio.ensure_future(run_agent(agent, [{"role": "user", "content": query}], config))
+    return agent, task
+
+async def hand_off(agent, query, speculation, on_text=None):
+    # Uses the speculative run when it guessed this agent, otherwise runs the agent now
+    if speculation and speculation[0] is agent:
+        try:
+            response = await speculation[1]
+        except Exception:
+            pass
+        else:
+            if on_text:
+                dispatch(on_text, response)
+            return response
+    return await run_agent(agent, [{"role": "user", "content": query}], config, on_text=on_text)
+
+# ---------- MAIN HANDLER ----------
+async def handle_support_query(query, on_text=None):
+    faq_answer = search_faq(query)
+    if "Maaf" not in faq_answer:
+        return faq_answer
+
+    policy_answer = search_return_policy(query)
+    if "specific information" not in policy_answer:
+        return policy_answer
+
+    cached = answer_cache.get(query)
+    if cached is not None:
+        if on_text:
+            dispatch(on_text, cached)
+        return cached
+
+    response, agent = await ask_agents(query, on_text)
+    # Escalations are drafts about one customer's problem, so they aren't reused
+    if agent is not escalation_agent:
+        answer_cache.put(query, response)
+    return response
+
+async def ask_agents(query, on_text=None):
+    # Returns (response, the agent that answered).
+    # A confident local intent skips the inquiry agent's routing round trip;
+    # everything else is still routed by the inquiry agent.
+    intent, confidence = intent_classifier.predict(query)
+    if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+        if intent == "human":
+            response = await run_agent(escalation_agent, [{"role": "user", "content": query}], config, on_text=on_text)
+            return response, escalation_agent
+        if intent == "returns":
+            response = await run_agent(returns_agent, [{"role": "user", "content": query}], config, on_text=on_text)
+            if "escalate_to_human" in response:
+                response = await run_agent(escalation_agent, [{"role": "user", "content": query}], config, on_text=on_text)
+                return response, escalation_agent
+            return response, returns_agent
+
+    # Not confident: the inquiry agent routes, and the weaker guess may already
+    # be running speculatively. Whatever isn't used is cancelled on the way out,
+    # and its outcome collected so a failed guess isn't logged as unretrieved.
+    speculation = start_speculation(query, intent, confidence)
+    try:
+        # The route is structured output, so it arrives whole rather than streamed
+        route = await run_agent(inquiry_agent, [{"role": "user", "content": query}], config)
+
+        if route.action == "answer":
+            if on_text:
+                dispatch(on_text, route.answer)
+            return route.answer, inquiry_agent
+
+        if route.action == "search_faq":
+            return search_faq(route.faq_query or query), inquiry_agent
+
+        if route.action == "escalate_to_returns":
+            response = await hand_off(returns_agent, query, speculation, on_text)
+            # The returns agent still answers in free text
+            if "escalate_to_human" not in response:
+                return response, returns_agent
+
+        response = await hand_off(escalation_agent, query, speculation, on_text)
+        return response, escalation_agent
+    finally:
+        if speculation:
+            speculation[1].cancel()
+            await asyncio.gather(speculation[1], return_exceptions=True)
+
+# ---------- JOBS ----------
+async def query_job(input, on_text=None):
+    stream = (lambda text: on_text("answer", text)) if on_text else None
+    return {"answer": await handle_support_query(input["query"], on_text=stream)}
+
+JOB_HANDLERS = {"query": query_job}
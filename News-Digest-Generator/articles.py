@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import re
+import datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, field_validator, model_validator
+
+# ---------- SETTINGS ----------
+SOURCES_PATH = os.getenv(
+    "NEWS_SOURCES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.json"),
+)
+with open(SOURCES_PATH, encoding="utf-8") as f:
+    _sources = json.load(f)
+
+# Source name -> reputation (0-1). Sources missing from the table are unknown and dropped.
+REPUTATION = _sources["sources"]
+MAX_AGE_DAYS = int(os.getenv("NEWS_MAX_AGE_DAYS", _sources.get("max_age_days", 7)))
+MIN_REPUTATION = float(os.getenv("NEWS_MIN_REPUTATION", _sources.get("min_reputation", 0.6)))
+
+DATE_FORMATS = ("%Y-%m-%d", "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y", "%Y/%m/%d", "%d/%m/%Y")
+
+
+# ---------- SCHEMA ----------
+class Article(BaseModel):
+    title: str
+    summary: str = ""
+    source: str = ""
+    date: Optional[datetime.date] = None
+    url: Optional[str] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def accept_aliases(cls, data):
+        # The search agent is free-form about key names
+        if isinstance(data, dict):
+            data = dict(data)
+            for alias in ("publication date", "publication_date", "published", "published_at", "publishedAt"):
+                if not data.get("date") and data.get(alias):
+                    data["date"] = data[alias]
+            if not data.get("summary"):
+                data["summary"] = data.get("content") or data.get("description") or ""
+            if not data.get("url"):
+                data["url"] = data.get("link")
+        return data
+
+    @field_validator("date", mode="before")
+    @classmethod
+    def parse_date(cls, value):
+        if not value or isinstance(value, datetime.date):
+            return value or None
+        text = str(value).strip()
+        try:
+            return datetime.datetime.fromisoformat(text.replace("Z", "+00:00")).date()
+        except ValueError:
+            pass
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+
+# ---------- AGENT OUTPUT ----------
+# What the search and filter agents must return (their output_type). Every
+# field is required so the schema is strict; Article does the lenient parsing.
+class SearchArticle(BaseModel):
+    title: str
+    summary: str
+    source: str
+    date: str
+    url: str
+
+class ArticleList(BaseModel):
+    articles: list[SearchArticle]
+
+def to_articles(article_list):
+    # An unreadable date becomes None (dropped by filter_articles), an empty url None
+    return [Article.model_validate(article.model_dump()) for article in article_list.articles]
+
+def articles_to_json(articles):
+    return json.dumps([article.model_dump(mode="json") for article in articles], ensure_ascii=False)
+
+
+# ---------- LOCAL FILTER ----------
+def normalize_source(source):
+    name = (source or "").strip().lower()
+    name = re.sub(r"^(https?://)?(www\.)?", "", name)
+    name = re.sub(r"\.(com|org|net|co\.uk|co|in|pk|tv)(/.*)?$", "", name)
+    name = re.sub(r"^the\s+", "", name)
+    name = re.sub(r"\s+news$", "", name)
+    return name.strip()
+
+def reputation(source):
+    name = normalize_source(source)
+    return REPUTATION.get(name, REPUTATION.get(f"the {name}"))
+
+def filter_articles(articles, today=None, max_age_days=MAX_AGE_DAYS, min_reputation=MIN_REPUTATION):
+    # Does the filter agent's job locally: drop articles that are undated,
+    # older than max_age_days, from the future, or from unknown/low-reputation sources.
+    today = today or datetime.date.today()
+    kept = []
+    for article in articles:
+        if article.date is None:
+            continue
+        age = (today - article.date).days
+        if age > max_age_days or age < -1:
+            continue
+        score = reputation(article.source)
+        if score is None or score < min_reputation:
+            continue
+        kept.append(article)
+    return kept
+
+
+# ---------- DEDUP ----------
+def normalize_title(title):
+    return " ".join(re.findall(r"[a-z0-9]+", (title or "").lower()))
+
+def normalize_url(url):
+    parts = urlsplit((url or "").strip().lower())
+    host = parts.netloc.removeprefix("www.")
+    return f"{host}{parts.path.rstrip('/')}" if host else ""
+
+def article_key(article):
+    # Same story under two topics -> same key. The URL wins when there is one,
+    # otherwise the normalized title.
+    identity = normalize_url(article.url) or normalize_title(article.title)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
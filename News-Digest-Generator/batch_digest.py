@@ -0,0 +1,57 @@
+import argparse
+import sys
+import time
+from datetime import date
+
+from connection import run_async
+from pipeline import handle_news_digest_batch
+from shared.ratelimit import BATCH, request_priority
+
+# Morning digests for many topics in one combined markdown file:
+#   python batch_digest.py topics.txt --output digest.md --workers 8
+# topics.txt has one topic per line; blank lines and lines starting with # are ignored.
+
+
+def read_topics(path):
+    with open(path, encoding="utf-8") as f:
+        topics = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    # Keep the first occurrence of each topic
+    return list(dict.fromkeys(topics))
+
+async def build_digest(topics, workers, failed):
+    # failed collects {topic: error} for topics whose digest couldn't be made
+    def on_error(topic, error):
+        failed[topic] = error
+        print(f"[failed] {topic}: {type(error).__name__}: {error}", flush=True)
+
+    with request_priority(BATCH):
+        return await handle_news_digest_batch(
+            topics, workers, on_done=lambda topic: print(f"[done] {topic}", flush=True), on_error=on_error
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one combined news digest for a list of topics.")
+    parser.add_argument("topics_file")
+    parser.add_argument("--output", default=f"digest-{date.today().isoformat()}.md")
+    parser.add_argument("--workers", type=int, default=8, help="topics processed at the same time (default: 8)")
+    args = parser.parse_args()
+
+    topics = read_topics(args.topics_file)
+    started = time.monotonic()
+    failed = {}
+    sections = run_async(build_digest(topics, args.workers, failed))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(f"# 📰 News Digest: {date.today().isoformat()}\n\n")
+        for topic, section in sections.items():
+            f.write(f"## {topic}\n\n{section}\n\n")
+
+    print(f"Wrote {len(topics)} topics to {args.output} in {time.monotonic() - started:.1f}s")
+    if failed:
+        # Everything that finished is in the file; the exit code flags the rest for cron
+        print(f"{len(failed)} topics failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
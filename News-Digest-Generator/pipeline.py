@@ -0,0 +1,137 @@
+import asyncio
+from agents import Agent
+from connection import config, run_agent, agent_cache
+from articles import ArticleList, article_key, articles_to_json, filter_articles, to_articles
+from shared.models import model_registry
+from shared.output_schema import RepairingOutputSchema, UnparsableOutput
+
+# ---------- AGENTS ----------
+search_agent = Agent(
+    name="Search Agent",
+    instructions="""
+You are an intelligent news search assistant.
+
+Given a user topic, your task is to find 3–5 recent news articles (from the last 7 days) that are directly related to the topic.
+
+Use any internal tools or web search capabilities available to retrieve real articles.
+
+For each article give:
+- title
+- summary: one or two sentences
+- source (e.g., BBC, Reuters)
+- date: publication date as YYYY-MM-DD
+- url: the article link, or "" if unknown
+""",
+    output_type=RepairingOutputSchema(ArticleList),
+)
+# Only used when the search output is JSON too broken to repair; normally
+# filter_articles() does this job locally (see articles.py and sources.json)
+filter_agent = Agent(
+    name="Filter Agent",
+    instructions="""
+You are a filtering agent for news content.
+
+You receive the Search Agent's list of articles, possibly as malformed JSON or text. Drop:
+- Any articles older than 7 days.
+- Any articles from unknown or unreliable sources.
+
+Return the remaining articles with the same fields: title, summary, source, date (YYYY-MM-DD), url.
+""",
+    output_type=RepairingOutputSchema(ArticleList),
+)
+
+
+digest_agent = Agent(
+    name="Digest Agent",
+    instructions="""
+Your task is to summarize each article in one concise sentence.
+Include the article title, the main point, and the source.
+Return a markdown-formatted digest with 3–5 bullet points.
+
+Only return the final digest in markdown. Do not explain what you're going to do.
+"""
+)
+
+# News goes stale quickly; the filter and digest only depend on their input
+agent_cache.set_ttl(search_agent.name, 10 * 60)
+agent_cache.set_ttl(filter_agent.name, 6 * 3600)
+agent_cache.set_ttl(digest_agent.name, 6 * 3600)
+
+# Model tiers (see shared/models.py). The digest only rewrites articles it is
+# given as bullets. The filter reformats broken search output, and moves up a
+# tier when its own output fails validation.
+model_registry.set_tier(digest_agent.name, "fast")
+model_registry.set_tier(filter_agent.name, "fast")
+
+NO_ARTICLES = "_No recent articles from trusted sources were found for this topic._"
+
+# ---------- AGENT FLOW ----------
+async def search_articles(topic):
+    # The search agent's typed output as a list of Article. Small JSON
+    # mistakes are repaired locally; output that can't be repaired goes to
+    # the filter agent, which returns it in the same schema.
+    try:
+        article_list = await run_agent(search_agent, [{"role": "user", "content": topic}], config)
+    except UnparsableOutput as e:
+        article_list = await run_agent(filter_agent, [{"role": "user", "content": e.text}], config)
+    return to_articles(article_list)
+
+async def handle_news_digest(topic, on_text=None):
+    # Only the digest is shown to the user, so it is the only step that streams
+    articles = filter_articles(await search_articles(topic))
+    if not articles:
+        return NO_ARTICLES
+
+    digest_response = await run_agent(digest_agent, [{"role": "user", "content": articles_to_json(articles)}], config, on_text=on_text)
+
+    return digest_response
+
+async def handle_news_digest_batch(topics, workers=8, on_done=None, on_error=None):
+    # Runs search -> filter -> digest for many topics with at most `workers`
+    # topics in flight. An article found under several topics is summarized
+    # only under the first topic whose search returns it; the other topics
+    # just point to it. A topic that fails gets a short note instead of its
+    # digest and on_error(topic, error) is called; the other topics carry on.
+    # Returns {topic: markdown section}.
+    claimed = {}  # article key -> topic that owns it
+    sections = {}
+    semaphore = asyncio.Semaphore(workers)
+
+    async def digest_topic(topic):
+        async with semaphore:
+            new, seen = [], []
+            try:
+                for article in filter_articles(await search_articles(topic)):
+                    key = article_key(article)
+                    if key in claimed:
+                        seen.append((article, claimed[key]))
+                    else:
+                        claimed[key] = topic
+                        new.append(article)
+
+                digest = ""
+                if new:
+                    digest = await run_agent(digest_agent, [{"role": "user", "content": articles_to_json(new)}], config)
+            except Exception as e:
+                # Its articles go back to the pool for topics that haven't searched yet
+                for article in new:
+                    claimed.pop(article_key(article), None)
+                sections[topic] = f"_Digest failed: {type(e).__name__}: {e}_"
+                if on_error:
+                    on_error(topic, e)
+                return
+            see_also = "\n".join(f"- {article.title} (see **{owner}**)" for article, owner in seen)
+            sections[topic] = "\n\n".join(part for part in (digest, see_also and f"Also covered:\n{see_also}") if part) or "_No new articles._"
+
+            if on_done:
+                on_done(topic)
+
+    await asyncio.gather(*(digest_topic(topic) for topic in topics))
+    return {topic: sections[topic] for topic in topics}
+
+# ---------- JOBS ----------
+async def digest_job(input, on_text=None):
+    stream = (lambda text: on_text("digest", text)) if on_text else None
+    return {"digest": await handle_news_digest(input["topic"], on_text=stream)}
+
+JOB_HANDLERS = {"digest": digest_job}
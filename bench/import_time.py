@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Cold-start benchmark: how long each app's main.py takes before the page is
+# drawn, in a fresh interpreter, with nothing submitted.
+#   python bench/import_time.py             # every app, median of 5 runs
+#   python bench/import_time.py --runs 10 --json
+#   python bench/import_time.py --before 29f64a1^   # also time the tree at a git ref
+# Streamlit runs the script in bare mode (no server), so widgets return their
+# defaults and only the startup path is timed. The cost of importing the
+# app's pipeline (agents SDK, PyMuPDF) is reported separately, since a lazily
+# importing app only pays it when the user submits.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = [
+    "Code-Review-Assistant",
+    "Customer-Support-Automation-System",
+    "News-Digest-Generator",
+    "study-assistant",
+    "travel-assistant",
+]
+
+# Runs inside the child interpreter; prints one JSON line
+PROBE = r"""
+import json, logging, runpy, sys, time
+logging.disable(logging.CRITICAL)
+started = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+runpy.run_path("main.py", run_name="__main__")
+main_done = time.perf_counter()
+main_modules = len(sys.modules)
+import pipeline
+pipeline_done = time.perf_counter()
+print(json.dumps({
+    "streamlit_s": streamlit_done - started,
+    "main_s": main_done - streamlit_done,
+    "pipeline_s": pipeline_done - main_done,
+    "modules": main_modules,
+}))
+"""
+
+
+def probe(app, root=REPO_ROOT):
+    env = {
+        **os.environ,
+        "API_KEY": os.environ.get("API_KEY", "bench"),
+        "METRICS_SINK": "none",
+        "SESSION_BACKEND": "none",
+        "PYTHONPATH": os.path.join(root, app),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=os.path.join(root, app),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(apps, runs, root=REPO_ROOT):
+    results = {}
+    for app in apps:
+        samples = [probe(app, root) for _ in range(runs)]
+        results[app] = {key: round(median([sample[key] for sample in samples]), 3) for key in samples[0]}
+    return results
+
+def measure_ref(ref, apps, runs):
+    # Checks ref out into a temporary git worktree, times it there and removes it
+    with tempfile.TemporaryDirectory(prefix="import-time-") as tmp:
+        tree = os.path.join(tmp, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", tree, ref], cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            return measure(apps, runs, tree)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", tree], cwd=REPO_ROOT, capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of each app's main.py.")
+    parser.add_argument("--apps", default=",".join(APPS))
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per app (default: 5)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--before", metavar="REF", help="also measure this git ref, e.g. the commit before lazy imports")
+    args = parser.parse_args()
+
+    apps = args.apps.split(",")
+    results = {"current": measure(apps, args.runs)}
+    if args.before:
+        results["before"] = measure_ref(args.before, apps, args.runs)
+
+    if args.json:
+        print(json.dumps(results if args.before else results["current"], indent=2))
+        return
+    print(f"{'app':<38}{'tree':>8}{'streamlit':>10}{'main.py':>10}{'pipeline':>10}{'modules':>9}")
+    for app in apps:
+        for tree in ("before", "current"):
+            if tree not in results:
+                continue
+            result = results[tree]
+            print(
+                f"{app:<38}{tree:>8}{result[app]['streamlit_s']:>10}{result[app]['main_s']:>10}"
+                f"{result[app]['pipeline_s']:>10}{result[app]['modules']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
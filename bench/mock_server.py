@@ -0,0 +1,191 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI-compatible chat completions endpoint. Replies
+# are deterministic for a given request, with configurable latency, streaming
+# rate and error injection. Point BASE_URL at http://127.0.0.1:<port>/v1/.
+
+
+def schema_reply(schema, defs=None, name="", index=1):
+    # A small valid instance of a JSON schema, for structured-output requests.
+    # Strings are filled by field name where the pipelines check them (news
+    # articles must be dated and from a known source to survive the filter).
+    defs = schema.get("$defs", {}) if defs is None else defs
+    if "$ref" in schema:
+        return schema_reply(defs[schema["$ref"].split("/")[-1]], defs, name, index)
+    if "anyOf" in schema:
+        return schema_reply(schema["anyOf"][0], defs, name, index)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {prop_name: schema_reply(prop, defs, prop_name, index) for prop_name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [schema_reply(schema.get("items", {}), defs, name, i) for i in range(1, 3)]
+    if kind in ("integer", "number"):
+        return 1
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    if name == "date":
+        return date.today().isoformat()
+    if name == "source":
+        return "Reuters"
+    if name == "url":
+        return f"https://example.com/mock-{index}"
+    if name == "title":
+        return f"Mock article {index}"
+    return " ".join(["lorem"] * 6)
+
+def canned_reply(messages, words, response_format=None):
+    if (response_format or {}).get("type") == "json_schema":
+        return json.dumps(schema_reply(response_format["json_schema"]["schema"]))
+    lines = [f"- Point {i}: " + " ".join(["lorem"] * 8) for i in range(1, max(2, words // 10) + 1)]
+    return "\n".join(lines)
+
+
+class MockSettings:
+    def __init__(self, latency=0.2, jitter=0.05, tokens_per_second=200.0, words=120, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.words = words
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0}
+
+    def draw(self):
+        # (delay, inject_error), drawn under a lock so runs are repeatable per seed
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+            return delay, failed
+
+
+def make_handler(settings):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without this Nagle's
+        # algorithm adds ~40ms to every response
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+
+            delay, failed = settings.draw()
+            time.sleep(delay)
+            if failed:
+                self._json(429, {"error": {"message": "mock rate limit", "type": "rate_limit"}}, {"Retry-After": "0.1"})
+                return
+
+            content = canned_reply(request.get("messages", []), settings.words, request.get("response_format"))
+            prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+            completion_tokens = max(1, len(content) // 4)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+            base = {"id": "chatcmpl-mock", "created": int(time.time()), "model": request.get("model", "mock")}
+
+            if not request.get("stream"):
+                self._json(200, {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def send(chunk):
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            chunk = {**base, "object": "chat.completion.chunk"}
+            pieces = content.split(" ")
+            for i, piece in enumerate(pieces):
+                delta = {"content": piece + (" " if i < len(pieces) - 1 else "")}
+                if i == 0:
+                    delta["role"] = "assistant"
+                send({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                if settings.tokens_per_second:
+                    time.sleep(1 / settings.tokens_per_second)
+            send({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                send({**chunk, "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def start_server(settings, host="127.0.0.1", port=0):
+    # Starts in a daemon thread; port 0 picks a free port (see server.server_port)
+    class Server(ThreadingHTTPServer):
+        # The default backlog of 5 drops connections at high concurrency
+        request_queue_size = 256
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            # Clients that hang up mid-stream (e.g. cancelled speculative runs) are normal
+            if not isinstance(sys.exc_info()[1], ConnectionError):
+                super().handle_error(request, client_address)
+
+    server = Server((host, port), make_handler(settings))
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat completions server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="streaming rate, 0 for no delay")
+    parser.add_argument("--words", type=int, default=120, help="approximate reply length")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.jitter, args.tokens_per_second, args.words, args.error_rate, args.seed)
+    server = start_server(settings, port=args.port)
+    print(f"Mock server on http://127.0.0.1:{server.server_port}/v1/ (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Offline benchmark for all five pipelines against bench/mock_server.py:
+#   python bench/run_bench.py                      # run and compare with bench/baseline.json
+#   python bench/run_bench.py --save-baseline      # store the current numbers as the baseline
+# Each (pipeline, concurrency) pair runs in its own process so peak RSS is per pipeline.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench.mock_server import MockSettings, start_server
+
+BASELINE_PATH = os.path.join(REPO_ROOT, "bench", "baseline.json")
+
+# ---------- FIXTURES ----------
+CODE_SAMPLE = '''
+def load_users(path):
+    f = open(path)
+    data = f.read()
+    users = []
+    for l in data.split("\\n"):
+        if l != "":
+            users.append(l.split(","))
+    return users
+
+class userManager:
+    def __init__(self, users):
+        self.u = users
+
+    def find(self, name):
+        for x in self.u:
+            if x[0] == name:
+                return x
+'''
+
+# ~2,400 lines, reviewed in chunks by the code-review pipeline
+LARGE_CODE_SAMPLE = "\n\n".join(
+    f"""def handler_{i}(request):
+    data = request.get("payload")
+    if data is None:
+        return None
+    result = []
+    for item in data:
+        result.append(item * {i})
+    return result"""
+    for i in range(270)
+)
+
+SUPPORT_QUERIES = [
+    "Mera order damaged aaya hai, ab kya karun?",
+    "Can you help me choose between two phone models?",
+    "Mujhe kisi insaan se baat karni hai",
+    "Do you sell refurbished laptops with warranty?",
+]
+
+NEWS_TOPICS = ["AI", "Cricket", "Climate", "Space exploration"]
+
+STUDY_NOTES = "\n".join(
+    f"Chapter {i}: Linear regression, gradient descent, regularization and model evaluation." for i in range(1, 40)
+)
+STUDY_TOPIC = "Machine Learning basics"
+STUDY_DEADLINE = "2026-12-31"
+
+TRIP = {
+    "country": "France",
+    "cities": ["Paris", "Nice", "Lyon"],
+    "travel_type": "Family",
+    "group_size": 4,
+    "duration": 7,
+    "budget": 3000,
+}
+# Same trip over ten cities; with the per-city fan-out it should cost about as much time as TRIP
+TRIP_10 = {
+    **TRIP,
+    "cities": ["Paris", "Nice", "Lyon", "Marseille", "Bordeaux", "Lille", "Strasbourg", "Toulouse", "Nantes", "Annecy"],
+    "duration": 14,
+}
+
+# name -> (app folder, function building the i-th request from the app's pipeline
+# module and an on_text callback). Only the -stream scenarios pass on_text on,
+# which switches the agents to streamed runs; those also report time to first output.
+SCENARIOS = {
+    "code-review": ("Code-Review-Assistant", lambda p, i, on_text: p.process_code_review(CODE_SAMPLE)),
+    "code-review-stream": ("Code-Review-Assistant", lambda p, i, on_text: p.process_code_review(CODE_SAMPLE, on_text=on_text)),
+    "code-review-large": ("Code-Review-Assistant", lambda p, i, on_text: p.process_code_review(LARGE_CODE_SAMPLE, filename="handlers.py")),
+    "support": ("Customer-Support-Automation-System", lambda p, i, on_text: p.handle_support_query(SUPPORT_QUERIES[i % len(SUPPORT_QUERIES)])),
+    "news": ("News-Digest-Generator", lambda p, i, on_text: p.handle_news_digest(NEWS_TOPICS[i % len(NEWS_TOPICS)])),
+    "study-text": ("study-assistant", lambda p, i, on_text: p.run_agents_with_text(STUDY_NOTES, STUDY_DEADLINE)),
+    "study-topic": ("study-assistant", lambda p, i, on_text: p.run_agents_with_topic(STUDY_TOPIC, STUDY_DEADLINE)),
+    "travel": ("travel-assistant", lambda p, i, on_text: p.run_agents(TRIP)),
+    "travel-stream": ("travel-assistant", lambda p, i, on_text: p.run_agents(TRIP, on_text=on_text)),
+    "travel-10": ("travel-assistant", lambda p, i, on_text: p.run_agents(TRIP_10)),
+}
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ---------- WORKER ----------
+def run_worker(scenario, concurrency, requests):
+    app_dir, make_request = SCENARIOS[scenario]
+    app_dir = os.path.join(REPO_ROOT, app_dir)
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+
+    import pipeline
+    from connection import run_async
+
+    async def drive():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        first_outputs = []
+        errors = []
+
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                first = []
+                # Only the first call matters; the UI would repaint a placeholder here
+                on_text = lambda *args: first or first.append(time.perf_counter())
+                try:
+                    await make_request(pipeline, i, on_text)
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+                    return
+                latencies.append(time.perf_counter() - started)
+                if first:
+                    first_outputs.append(first[0] - started)
+
+        # The first Runner.run in a process pays one-off SDK warm-up; keep it out of the numbers
+        await make_request(pipeline, 0, lambda *args: None)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return latencies, first_outputs, errors, time.perf_counter() - started
+
+    latencies, first_outputs, errors, elapsed = run_async(drive())
+    print(json.dumps({
+        "latencies": latencies,
+        "first_outputs": first_outputs,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "elapsed": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+# ---------- DRIVER ----------
+def run_case(scenario, concurrency, requests, base_url):
+    env = {
+        **os.environ,
+        "API_KEY": "bench",
+        "BASE_URL": base_url,
+        # The limiter and cache would otherwise dominate the numbers
+        "MODEL_RPM": "1000000000",
+        "MODEL_TPM": "1000000000000",
+        "AGENT_CACHE_ENABLED": "0",
+        "SEMANTIC_CACHE_ENABLED": "0",
+        "METRICS_SINK": "none",
+    }
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", scenario,
+         "--concurrency", str(concurrency), "--requests", str(requests)],
+        env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{scenario} worker failed:\n{completed.stderr}")
+    raw = json.loads(completed.stdout.strip().splitlines()[-1])
+    latencies = raw["latencies"]
+    return {
+        "requests": requests,
+        "errors": raw["errors"],
+        "first_error": raw["first_error"],
+        "throughput_rps": round(len(latencies) / raw["elapsed"], 3) if raw["elapsed"] else 0.0,
+        "p50_s": round(percentile(latencies, 50) or 0, 4),
+        "p95_s": round(percentile(latencies, 95) or 0, 4),
+        "p99_s": round(percentile(latencies, 99) or 0, 4),
+        # Seconds to the first streamed text; None when the scenario doesn't stream
+        "first_output_p50_s": round(percentile(raw["first_outputs"], 50), 4) if raw["first_outputs"] else None,
+        "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+    }
+
+def compare(results, baseline, tolerance):
+    # Returns a list of human-readable regressions
+    regressions = []
+    for case, current in results.items():
+        previous = baseline.get(case)
+        if not previous:
+            continue
+        if current["p95_s"] > previous["p95_s"] * (1 + tolerance):
+            regressions.append(f"{case}: p95 {previous['p95_s']}s -> {current['p95_s']}s")
+        first, first_before = current.get("first_output_p50_s"), previous.get("first_output_p50_s")
+        if first and first_before and first > first_before * (1 + tolerance):
+            regressions.append(f"{case}: first output p50 {first_before}s -> {first}s")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{case}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{case}: peak RSS {previous['peak_rss_mb']} -> {current['peak_rss_mb']} MB")
+    return regressions
+
+def mismatched_requests(baseline, cases, requests):
+    # Cases recorded with another --requests; their numbers aren't comparable
+    return sorted(case for case in cases if case in baseline and baseline[case].get("requests") != requests)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agent pipelines against a local mock model server.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=32, help="requests per level (default: 32)")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock seconds before first byte")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="mock streaming rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock requests answered with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to the baseline file, keeping cases not run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression vs baseline (default: 0.2)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, int(args.concurrency), args.requests)
+        return
+
+    cases = [f"{scenario}@{level}" for scenario in args.scenarios.split(",")
+             for level in (int(c) for c in args.concurrency.split(","))]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    # Checked before the run: comparing, or mixing counts in one baseline file, would be meaningless
+    kept = cases if not args.save_baseline else [case for case in baseline if case not in cases]
+    mismatched = mismatched_requests(baseline, kept, args.requests)
+    if mismatched:
+        counts = sorted({baseline[case].get("requests") for case in mismatched}, key=str)
+        raise SystemExit(
+            f"{args.baseline} has {', '.join(mismatched)} recorded with --requests "
+            f"{', '.join(map(str, counts))}, not {args.requests}. Rerun with the same --requests, "
+            f"or record every case again with --save-baseline."
+        )
+
+    settings = MockSettings(
+        latency=args.latency, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, seed=args.seed,
+    )
+    server = start_server(settings)
+    base_url = f"http://127.0.0.1:{server.server_port}/v1/"
+
+    results = {}
+    print(f"{'case':<22}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'first':>9}{'rss MB':>9}{'errors':>8}")
+    for scenario in args.scenarios.split(","):
+        for level in (int(c) for c in args.concurrency.split(",")):
+            case = f"{scenario}@{level}"
+            result = run_case(scenario, level, args.requests, base_url)
+            results[case] = result
+            print(
+                f"{case:<22}{result['throughput_rps']:>9}{result['p50_s']:>9}{result['p95_s']:>9}"
+                f"{result['p99_s']:>9}{result['first_output_p50_s'] or '-':>9}{result['peak_rss_mb']:>9}{result['errors']:>8}"
+            )
+            if result["first_error"]:
+                print(f"  first error: {result['first_error']}")
+    server.shutdown()
+
+    if args.save_baseline:
+        # Cases that weren't run keep their recorded numbers
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Checks the semantic cache thresholds against labelled pairs of questions:
+#   python bench/semantic_eval.py              # hit rate and false hits per cache
+#   python bench/semantic_eval.py --verbose    # every pair with its similarity
+# A pair in "same" should reuse the answer, one in "different" must not. Each
+# cache is checked in its own process, with the stopwords and threshold its
+# pipeline gives it. For a cache with a scope function, "conversations" asks
+# the same question after two histories on one plan; "shared" says whether the
+# second may reuse the first's answer. Exits with status 1 if any "different"
+# pair, or any conversation that must not share, would hit.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAIRS_PATH = os.path.join(REPO_ROOT, "bench", "semantic_pairs.json")
+
+# section in the pairs file -> (app dir, cache in its pipeline, scope function or None)
+CACHES = {
+    "support": ("Customer-Support-Automation-System", "answer_cache", None),
+    "travel": ("travel-assistant", "qa_cache", "qa_scope"),
+}
+
+
+# ---------- WORKER ----------
+def run_worker(section, pairs_path):
+    app_dir, cache_name, scope_name = CACHES[section]
+    app_dir = os.path.join(REPO_ROOT, app_dir)
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    sys.path.insert(0, REPO_ROOT)
+
+    import pipeline
+    from shared.semantic_cache import SemanticCache
+
+    with open(pairs_path, encoding="utf-8") as f:
+        pairs = json.load(f)[section]
+    app_cache = getattr(pipeline, cache_name)
+
+    def fresh_cache():
+        # A fresh cache per check, so only the check itself can match
+        return SemanticCache(app_cache.name, stopwords=app_cache.stopwords, threshold=app_cache.threshold,
+                             max_entries=1, ttl=60, enabled=True)
+
+    results = []
+    for label in ("same", "different"):
+        for first, second in pairs[label]:
+            cache = fresh_cache()
+            cache.put(first, "answer")
+            similarity = cache.search(second)[0][0]
+            results.append({"label": label, "pair": [first, second], "similarity": round(similarity, 3),
+                            "hit": cache.get(second) is not None})
+    conversations = []
+    if scope_name:
+        scope = getattr(pipeline, scope_name)
+        for case in pairs.get("conversations", []):
+            first = {"plan": "checked plan", "summary": "", "turns": case["history"]}
+            second = {"plan": "checked plan", "summary": "", "turns": case["other_history"]}
+            cache = fresh_cache()
+            cache.put(case["question"], "answer", scope(first, case["question"]))
+            hit = cache.get(case["question"], scope(second, case["question"])) is not None
+            conversations.append({"question": case["question"], "shared": case["shared"], "hit": hit})
+    print(json.dumps({"threshold": app_cache.threshold, "results": results, "conversations": conversations}))
+
+
+# ---------- REPORT ----------
+def evaluate(section, pairs_path):
+    # No model is called; the key only lets the pipeline import
+    env = {**os.environ, "API_KEY": os.getenv("API_KEY", "eval"), "METRICS_SINK": "none"}
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", section, "--pairs", pairs_path],
+        env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"{section}: worker failed\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check semantic cache thresholds against labelled question pairs")
+    parser.add_argument("--caches", default=",".join(CACHES), help="comma-separated subset of: " + ", ".join(CACHES))
+    parser.add_argument("--pairs", default=PAIRS_PATH)
+    parser.add_argument("--verbose", action="store_true", help="print every pair")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.pairs)
+        return
+
+    print(f"{'cache':<10}{'threshold':>10}{'hit rate':>12}{'false hits':>12}{'max diff':>10}")
+    failed = False
+    for section in args.caches.split(","):
+        report = evaluate(section, args.pairs)
+        same = [r for r in report["results"] if r["label"] == "same"]
+        different = [r for r in report["results"] if r["label"] == "different"]
+        hits = sum(r["hit"] for r in same)
+        false_hits = sum(r["hit"] for r in different)
+        # The closest a "different" pair gets; the threshold has to stay above it
+        closest = max(r["similarity"] for r in different)
+        print(f"{section:<10}{report['threshold']:>10.2f}{f'{hits}/{len(same)}':>12}"
+              f"{f'{false_hits}/{len(different)}':>12}{closest:>10.3f}")
+        if args.verbose:
+            for r in sorted(report["results"], key=lambda r: (r["label"], -r["similarity"])):
+                mark = "hit " if r["hit"] else "miss"
+                print(f"    {r['label']:<10} {mark} {r['similarity']:>6.3f}  {r['pair'][0]!r} / {r['pair'][1]!r}")
+        failed = failed or false_hits > 0
+        conversations = report["conversations"]
+        if conversations:
+            wrong = [c for c in conversations if c["hit"] != c["shared"]]
+            print(f"{'':<10}conversations: {len(conversations) - len(wrong)}/{len(conversations)} as expected")
+            for c in wrong:
+                print(f"    {'reused' if c['hit'] else 'not reused'} after a different history: {c['question']!r}")
+            failed = failed or any(c["hit"] and not c["shared"] for c in conversations)
+    if failed:
+        print("Some different questions would get each other's answers.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Code shared by all five Streamlit apps. Each app's connection.py puts the
+# repo root on sys.path and re-exports what it needs from here.
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ---------- SETTINGS ----------
+DEFAULT_TTL = float(os.getenv("AGENT_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "512"))
+# Set AGENT_CACHE_PATH to a file to also keep results in SQLite across restarts
+CACHE_PATH = os.getenv("AGENT_CACHE_PATH")
+DISK_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_DISK_MAX_ENTRIES", "5000"))
+# Set AGENT_CACHE_ENABLED=0 to turn caching off, e.g. for benchmarks
+CACHE_ENABLED = os.getenv("AGENT_CACHE_ENABLED", "1") != "0"
+# Per-agent TTL overrides in seconds, e.g. {"Search Agent": 300}. 0 disables caching.
+TTL_OVERRIDES = json.loads(os.getenv("AGENT_CACHE_TTLS", "{}"))
+
+_MISSING = object()
+
+
+class AgentCache:
+    def __init__(self, max_entries=MAX_ENTRIES, default_ttl=DEFAULT_TTL, path=None, disk_max_entries=DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.disk_max_entries = disk_max_entries
+        self.ttls = {}
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0}
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS agent_cache ("
+                "key TEXT PRIMARY KEY, value BLOB, expires_at REAL, last_used REAL)"
+            )
+            self._db.commit()
+
+    def set_ttl(self, agent_name, seconds):
+        self.ttls[agent_name] = seconds
+
+    def ttl_for(self, agent_name):
+        if not CACHE_ENABLED:
+            return 0
+        return TTL_OVERRIDES.get(agent_name, self.ttls.get(agent_name, self.default_ttl))
+
+    def make_key(self, agent, input, model_name):
+        payload = json.dumps(
+            {
+                "agent": agent.name,
+                "instructions": agent.instructions if isinstance(agent.instructions, str) else repr(agent.instructions),
+                "output_type": repr(getattr(agent, "output_type", None)),
+                "model": model_name,
+                "input": input,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM agent_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._db.execute("UPDATE agent_cache SET last_used = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = pickle.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return _MISSING
+
+    def put(self, key, agent_name, value):
+        ttl = self.ttl_for(agent_name)
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO agent_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, pickle.dumps(value), expires_at, time.time()),
+                )
+                # Drop expired rows, then the least recently used ones over the limit
+                self._db.execute("DELETE FROM agent_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.execute(
+                    "DELETE FROM agent_cache WHERE key IN ("
+                    "SELECT key FROM agent_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM agent_cache")
+                self._db.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+def is_hit(value):
+    return value is not _MISSING
+
+
+agent_cache = AgentCache(path=CACHE_PATH)
@@ -0,0 +1,173 @@
+from dotenv import load_dotenv
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+from types import SimpleNamespace
+
+load_dotenv()
+
+
+api_key = os.getenv("API_KEY")
+# Check if the API key is present; if not, raise an error
+if not api_key:
+    raise ValueError("API_KEY is not set. Please ensure it is defined in your .env file.")
+
+#Reference: https://ai.google.dev/gemini-api/docs/openai
+BASE_URL = os.getenv("BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+MODEL_NAME = os.getenv("MODEL_NAME", "gemini-2.0-flash")
+
+# ---------- HTTP POOL ----------
+# Keep-alive pool sizes and timeouts, overridable from .env
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+_pool_counters = {"requests": 0, "in_flight": 0, "errors": 0}
+
+# ---------- CLIENT ----------
+# The HTTP pool, OpenAI client, model and run config are built on first use.
+# httpx and the agents SDK take well over a second to import, so a Streamlit
+# page can render before any of them is needed. After that every caller in
+# the process shares the same objects. Read them as module attributes
+# (connection.config, connection.model, ...) or through get_client(). Each
+# app's connection.py forwards these names, and run_agent, the same way.
+_client = None
+_client_lock = threading.Lock()
+_LAZY = ("config", "model", "external_client", "http_client", "transport", "pool_limits")
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _build_client()
+    return _client
+
+def _build_client():
+    import httpx
+    from agents import RunConfig , OpenAIChatCompletionsModel , AsyncOpenAI, set_tracing_disabled
+
+    from .ratelimit import RateLimitedModel, limiter
+
+    set_tracing_disabled(True)
+
+    class PooledTransport(httpx.AsyncHTTPTransport):
+        # Counts requests going through the pool so pool_stats() can report them
+        async def handle_async_request(self, request):
+            _pool_counters["requests"] += 1
+            _pool_counters["in_flight"] += 1
+            try:
+                return await super().handle_async_request(request)
+            except Exception:
+                _pool_counters["errors"] += 1
+                raise
+            finally:
+                _pool_counters["in_flight"] -= 1
+
+    pool_limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    transport = PooledTransport(limits=pool_limits)
+    http_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT))
+
+    external_client = AsyncOpenAI(
+        api_key= api_key,
+        base_url=BASE_URL,
+        http_client=http_client,
+        # Retries are handled by RateLimitedModel so they respect the shared limiter
+        max_retries=0,
+    )
+
+    model = RateLimitedModel(
+        OpenAIChatCompletionsModel(
+            model=MODEL_NAME,
+            openai_client=external_client
+        ),
+        limiter,
+    )
+
+    config = RunConfig(
+        model=model,
+        model_provider=external_client,
+        tracing_disabled=True
+    )
+    return SimpleNamespace(
+        pool_limits=pool_limits,
+        transport=transport,
+        http_client=http_client,
+        external_client=external_client,
+        model=model,
+        config=config,
+    )
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(get_client(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def pool_stats():
+    pool = getattr(_client.transport, "_pool", None) if _client else None
+    connections = list(getattr(pool, "connections", []))
+    return {
+        **_pool_counters,
+        "open_connections": len(connections),
+        "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+        "max_connections": MAX_CONNECTIONS,
+        "max_keepalive_connections": MAX_KEEPALIVE_CONNECTIONS,
+    }
+
+# ---------- EVENT LOOP ----------
+# Streamlit re-runs the script on every interaction. Running each pipeline with
+# a fresh asyncio.run() would tear down the loop the pooled connections belong
+# to, so all agent work runs on one long-lived loop in a background thread.
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+# Queue of callbacks that must run on the thread that called run_async()
+_caller_calls = contextvars.ContextVar("caller_calls", default=None)
+
+def get_loop():
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="agents-loop", daemon=True)
+            _loop_thread.start()
+    return _loop
+
+def run_async(coro):
+    # Drop-in replacement for asyncio.run(coro) that reuses the shared loop
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("run_async() can't be called from inside the shared event loop; await the coroutine instead.")
+
+    calls = queue.Queue()
+
+    async def with_caller():
+        _caller_calls.set(calls)
+        return await coro
+
+    future = asyncio.run_coroutine_threadsafe(with_caller(), get_loop())
+    future.add_done_callback(lambda _: calls.put(None))
+    try:
+        while (call := calls.get()) is not None:
+            fn, args = call
+            fn(*args)
+    except BaseException:
+        future.cancel()
+        raise
+    return future.result()
+
+def dispatch(fn, *args):
+    # Run fn on the caller's thread (the Streamlit script thread), e.g. to
+    # update a placeholder from inside an agent pipeline.
+    calls = _caller_calls.get()
+    if calls is None:
+        fn(*args)
+    else:
+        calls.put((fn, args))
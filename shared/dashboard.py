@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pandas as pd
+import streamlit as st
+
+# Run with: streamlit run shared/dashboard.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.metrics import METRICS_PATH, load_rows
+
+# ---------- PAGE CONFIG ----------
+st.set_page_config(page_title="📊 Agent Metrics", layout="wide")
+st.title("📊 Agent Metrics")
+st.caption(f"Reading {METRICS_PATH}")
+
+rows = load_rows()
+if not rows:
+    st.info("No agent runs recorded yet. Use any of the apps and refresh this page.")
+    st.stop()
+
+df = pd.DataFrame(rows)
+df["ts"] = pd.to_datetime(df["ts"], unit="s")
+# Rows recorded before input trimming and model tiers
+if "tokens_saved" not in df:
+    df["tokens_saved"] = 0
+if "tier" not in df:
+    df["tier"] = None
+
+# ---------- FILTERS ----------
+apps = sorted(df["app"].unique())
+selected_apps = st.multiselect("Apps", apps, default=apps)
+hours = st.slider("Last N hours", 1, 24 * 7, 24)
+df = df[df["app"].isin(selected_apps) & (df["ts"] >= pd.Timestamp.now() - pd.Timedelta(hours=hours))]
+if df.empty:
+    st.info("No runs match these filters.")
+    st.stop()
+
+# ---------- PER-AGENT LATENCY ----------
+def p50(series):
+    return series.quantile(0.5)
+
+def p95(series):
+    return series.quantile(0.95)
+
+summary = df.groupby(["app", "agent"]).agg(
+    runs=("wall_s", "size"),
+    errors=("status", lambda s: (~s.isin(["ok", "escalated"])).sum()),
+    cache_hit_rate=("cache", lambda s: s.isin(["hit", "semantic"]).mean()),
+    wall_p50=("wall_s", p50),
+    wall_p95=("wall_s", p95),
+    queue_p95=("queue_s", p95),
+    ttft_p50=("ttft_s", p50),
+    ttft_p95=("ttft_s", p95),
+    input_tokens=("input_tokens", "sum"),
+    output_tokens=("output_tokens", "sum"),
+    tokens_saved=("tokens_saved", "sum"),
+).reset_index()
+
+st.subheader("⏱️ Latency per agent (seconds)")
+st.dataframe(summary, use_container_width=True, hide_index=True)
+
+st.subheader("📈 Wall time p95 per agent")
+st.bar_chart(summary.set_index("agent")["wall_p95"])
+
+# ---------- PER-TIER LATENCY ----------
+# Model calls only: cache hits never reach a tier
+calls = df[df["tier"].notna() & ~df["cache"].isin(["hit", "semantic"])]
+if not calls.empty:
+    tiers = calls.groupby(["tier", "model"]).agg(
+        runs=("wall_s", "size"),
+        escalation_rate=("status", lambda s: (s == "escalated").mean()),
+        wall_p50=("wall_s", p50),
+        wall_p95=("wall_s", p95),
+        ttft_p50=("ttft_s", p50),
+        output_tokens=("output_tokens", "sum"),
+    ).reset_index()
+    st.subheader("🎚️ Latency per model tier (seconds)")
+    st.dataframe(tiers, use_container_width=True, hide_index=True)
+
+st.subheader("🧾 Recent runs")
+st.dataframe(df.sort_values("ts", ascending=False).head(200), use_container_width=True, hide_index=True)
@@ -0,0 +1,320 @@
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from .metrics import metrics
+
+# ---------- SETTINGS ----------
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set JOB_QUEUE=1 to send pipeline runs to worker processes (python -m shared.worker)
+# instead of running them inside the Streamlit process
+JOB_QUEUE = os.getenv("JOB_QUEUE", "0") == "1"
+JOBS_PATH = os.getenv("JOBS_PATH", os.path.join(REPO_ROOT, "jobs.db"))
+# Uploaded files are passed to jobs by path, from this folder
+JOB_FILES_PATH = os.getenv("JOB_FILES_PATH", os.path.join(os.path.dirname(os.path.abspath(JOBS_PATH)), "job_files"))
+# Finished jobs are kept (and returned for identical submissions) this long
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+# A running job whose worker hasn't reported for this long is handed to another worker
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Seconds between progress checks, for the UI and the workers alike
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.25"))
+# Module in each app folder whose JOB_HANDLERS dict maps a job kind to
+# `async def handler(input, on_text)`. The input and the returned result are
+# JSON; on_text(key, text) streams output. run_job calls the handler in the
+# Streamlit process, or in a worker process when JOB_QUEUE=1.
+JOB_MODULE = "pipeline"
+
+QUEUED, RUNNING, DONE, ERROR, CANCELLED = "queued", "running", "done", "error", "cancelled"
+
+
+class JobError(RuntimeError):
+    pass
+
+
+class JobCancelled(JobError):
+    pass
+
+
+def input_hash(app, kind, input):
+    payload = json.dumps({"app": app, "kind": kind, "input": input}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    # Jobs are rows in one SQLite file shared by the UIs and the workers. A
+    # job is queued, claimed by one worker (running), and ends as done, error
+    # or cancelled. Identical submissions (same app, kind and input) share one
+    # job while it is queued, running or recently done.
+
+    def __init__(self, path=JOBS_PATH, result_ttl=JOB_RESULT_TTL, stale_after=JOB_STALE_AFTER):
+        self.result_ttl = result_ttl
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, app TEXT, kind TEXT, input_hash TEXT, input TEXT, status TEXT,"
+            "progress TEXT, result TEXT, error TEXT, worker TEXT, attempts INTEGER DEFAULT 0,"
+            "cancel_requested INTEGER DEFAULT 0, created REAL, started REAL, finished REAL, heartbeat REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_hash ON jobs (input_hash, status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (app, status, created)")
+        self._db.commit()
+
+    def submit(self, app, kind, input):
+        # Returns the job ID, reusing a live or recently finished identical job
+        digest = input_hash(app, kind, input)
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished <= ?", (now - self.result_ttl,))
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE input_hash = ? AND (status IN (?, ?) OR (status = ? AND finished > ?)) "
+                "ORDER BY created DESC LIMIT 1",
+                (digest, QUEUED, RUNNING, DONE, now - self.result_ttl),
+            ).fetchone()
+            if row:
+                self._db.commit()
+                return row["id"]
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, app, kind, input_hash, input, status, progress, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, '{}', ?)",
+                (job_id, app, kind, digest, json.dumps(input, ensure_ascii=False), QUEUED, now),
+            )
+            self._db.commit()
+        return job_id
+
+    def get(self, job_id):
+        # The job as a dict (input, progress and result decoded), or None
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ("input", "progress", "result"):
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def cancel(self, job_id):
+        # A queued job is cancelled at once; a running one when its worker next reports
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, QUEUED),
+            )
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING)
+            )
+            self._db.commit()
+
+    def claim(self, app, kinds, worker):
+        # Atomically takes the oldest queued job of one of `kinds` for this worker
+        now = time.time()
+        placeholders = ", ".join("?" * len(kinds))
+        with self._lock:
+            self._requeue_stale(now)
+            row = self._db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started = ?, heartbeat = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM jobs WHERE app = ? AND status = ? "
+                f"AND kind IN ({placeholders}) ORDER BY created LIMIT 1) "
+                "RETURNING id, kind, input",
+                (RUNNING, worker, now, now, app, QUEUED, *kinds),
+            ).fetchone()
+            self._db.commit()
+        if row is None:
+            return None
+        return {"id": row["id"], "kind": row["kind"], "input": json.loads(row["input"])}
+
+    def _requeue_stale(self, now):
+        # Jobs of a worker that died go back to the queue, up to JOB_MAX_ATTEMPTS runs
+        stale = now - self.stale_after
+        self._db.execute(
+            "UPDATE jobs SET status = ?, finished = ?, error = 'worker stopped responding' "
+            "WHERE status = ? AND heartbeat < ? AND attempts >= ?",
+            (ERROR, now, RUNNING, stale, JOB_MAX_ATTEMPTS),
+        )
+        self._db.execute(
+            "UPDATE jobs SET status = CASE WHEN cancel_requested THEN ? ELSE ? END, "
+            "finished = CASE WHEN cancel_requested THEN ? END, worker = NULL "
+            "WHERE status = ? AND heartbeat < ?",
+            (CANCELLED, QUEUED, now, RUNNING, stale),
+        )
+
+    def report(self, job_id, worker, progress):
+        # Heartbeat from the worker with the output streamed so far. Returns
+        # True when the worker should stop: the job was cancelled, or was
+        # handed to another worker after this one went quiet.
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE jobs SET progress = ?, heartbeat = ? WHERE id = ? AND worker = ? AND status = ? "
+                "RETURNING cancel_requested",
+                (json.dumps(progress, ensure_ascii=False), time.time(), job_id, worker, RUNNING),
+            ).fetchone()
+            self._db.commit()
+        return row is None or bool(row["cancel_requested"])
+
+    def finish(self, job_id, worker, status, result=None, error=None, progress=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = COALESCE(?, progress), finished = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    json.dumps(progress, ensure_ascii=False) if progress is not None else None,
+                    time.time(),
+                    job_id,
+                    worker,
+                    RUNNING,
+                ),
+            )
+            self._db.commit()
+
+    def requeue(self, job_id, worker):
+        # A worker shutting down hands its job back without counting the attempt
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = CASE WHEN cancel_requested THEN ? ELSE ? END, "
+                "finished = CASE WHEN cancel_requested THEN ? END, worker = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (CANCELLED, QUEUED, time.time(), job_id, worker, RUNNING),
+            )
+            self._db.commit()
+
+    def active(self):
+        # Queued and running jobs, oldest first
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, app, kind, status, worker, created FROM jobs WHERE status IN (?, ?) ORDER BY created",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def wait(self, job_id, on_text=None, on_poll=None, poll_interval=JOB_POLL_INTERVAL):
+        # Polls until the job ends and returns its result. on_text(key, text)
+        # is called on this thread whenever streamed output changes, and
+        # on_poll(job) on every poll.
+        seen = {}
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise JobError(f"job {job_id} no longer exists")
+            if on_poll:
+                on_poll(job)
+            if on_text:
+                for key, text in (job["progress"] or {}).items():
+                    if seen.get(key) != text:
+                        seen[key] = text
+                        on_text(key, text)
+            if job["status"] == DONE:
+                return job["result"]
+            if job["status"] == CANCELLED:
+                raise JobCancelled(f"job {job_id} was cancelled")
+            if job["status"] == ERROR:
+                raise JobError(job["error"] or f"job {job_id} failed")
+            time.sleep(poll_interval)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+    return _queue
+
+def save_upload(uploaded_file, suffix=""):
+    # Copies an upload into JOB_FILES_PATH in 1 MB pieces and returns its
+    # path, to go in a job's input instead of the file's bytes. The name is
+    # the content hash, so identical uploads still share one job. The job
+    # deletes the file when it's done; files left behind (a cancelled job, or
+    # an upload answered from a finished job) are removed after JOB_RESULT_TTL.
+    os.makedirs(JOB_FILES_PATH, exist_ok=True)
+    now = time.time()
+    for entry in os.scandir(JOB_FILES_PATH):
+        if entry.is_file() and entry.stat().st_mtime <= now - JOB_RESULT_TTL:
+            os.unlink(entry.path)
+
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=JOB_FILES_PATH, suffix=".part", delete=False) as tmp:
+        while chunk := uploaded_file.read(1024 * 1024):
+            digest.update(chunk)
+            tmp.write(chunk)
+    path = os.path.join(JOB_FILES_PATH, digest.hexdigest() + suffix)
+    os.replace(tmp.name, path)
+    return path
+
+def handlers():
+    return importlib.import_module(JOB_MODULE).JOB_HANDLERS
+
+def run_job(kind, input, on_text=None):
+    # Runs one of the app's JOB_HANDLERS and returns its result. The input and
+    # result must be JSON-serializable. With JOB_QUEUE=1 the job goes to a
+    # worker process and this call polls it, showing a cancel button; otherwise
+    # it runs here on the shared event loop.
+    if not JOB_QUEUE:
+        from .connection import run_async
+
+        return run_async(handlers()[kind](input, on_text))
+
+    import streamlit as st
+
+    queue = get_queue()
+    job_id = queue.submit(metrics.app, kind, input)
+    status = st.empty()
+    # The click reruns the script, which stops this wait; the callback runs first
+    cancel = st.empty()
+    cancel.button("⏹️ Cancel", key=f"cancel-{job_id}", on_click=queue.cancel, args=(job_id,))
+
+    def show_status(job):
+        # Touching the page on every poll is also what lets Streamlit stop
+        # this run when Cancel is clicked before any output has arrived
+        status.caption("⏳ Waiting for a worker..." if job["status"] == QUEUED else "⚙️ Running in a worker...")
+
+    try:
+        return queue.wait(job_id, on_text, show_status)
+    except JobCancelled:
+        pass
+    finally:
+        status.empty()
+        cancel.empty()
+    # Cancelled from another session sharing this job, or with python -m shared.jobs cancel
+    st.warning("⏹️ This run was cancelled.")
+    st.stop()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or cancel queued pipeline jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show jobs that are queued or running")
+    cancel = commands.add_parser("cancel", help="cancel a job")
+    cancel.add_argument("job_id")
+    args = parser.parse_args()
+
+    queue = get_queue()
+    if args.command == "cancel":
+        queue.cancel(args.job_id)
+        return
+    for row in queue.active():
+        age = time.time() - row["created"]
+        print(f"{row['id']}  {row['app']:<36}{row['kind']:<16}{row['status']:<9}{age:>7.0f}s  {row['worker'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import re
+
+# Small, local repairs for almost-JSON model output, so a stray code fence or
+# trailing comma doesn't cost another model call. Every repair skips string
+# contents, so text inside a value is never rewritten.
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*[\]}]")
+_SMART_QUOTES = "“”„"
+
+
+def _scan(text):
+    # Yields (index, char, in_string) for a JSON text, in_string being the
+    # state after the char: True for an opening quote, False for a closing one
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if escaped:
+            escaped = False
+        elif in_string and char == "\\":
+            escaped = True
+        elif char == '"':
+            in_string = not in_string
+        yield i, char, in_string
+
+def _outermost(text):
+    # Slice from the first { or [ to the bracket that closes it. Without one
+    # (a truncated reply), everything from the start is kept for
+    # _close_brackets to finish.
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    start = min(starts)
+    depth = 0
+    for i, char, in_string in _scan(text[start:]):
+        if in_string or char == '"':
+            continue
+        if char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return text[start:start + i + 1]
+    return text[start:]
+
+def _straighten_quotes(text):
+    # “key”: “value” -> "key": "value". Only curly quotes used as string
+    # delimiters change; curly quotes inside a normal string stay as they are.
+    out = []
+    closer = None  # what ends the current string: '"', or any curly quote
+    escaped = False
+    for char in text:
+        if closer is None:
+            if char == '"':
+                closer = '"'
+            elif char in _SMART_QUOTES:
+                closer, char = _SMART_QUOTES, '"'
+        elif escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in closer:
+            closer, char = None, '"'
+        elif char == '"':
+            # A straight quote inside a curly-quoted string is content
+            char = '\\"'
+        out.append(char)
+    return "".join(out)
+
+def _close_brackets(text):
+    # Closes brackets/braces left open by a truncated reply
+    stack = []
+    in_string = False
+    for _, char, in_string in _scan(text):
+        if in_string:
+            continue
+        if char in "[{":
+            stack.append("]" if char == "[" else "}")
+        elif char in "]}" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text + "".join(reversed(stack))
+
+def _drop_trailing_commas(text):
+    return "".join(
+        char for i, char, in_string in _scan(text)
+        if in_string or char != "," or not _TRAILING_COMMA.match(text, i)
+    )
+
+def repair_json(text):
+    # Returns text unchanged when it already parses
+    try:
+        json.loads(text)
+        return text
+    except json.JSONDecodeError:
+        pass
+    fence = _FENCE.search(text)
+    if fence:
+        text = fence.group(1)
+    text = _outermost(_straighten_quotes(text.strip()))
+    text = _close_brackets(text)
+    return _drop_trailing_commas(text)
+
+
+if __name__ == "__main__":
+    # Regression check: python -m shared.jsonrepair
+    import sys
+
+    cases = [
+        ('{"a": "x, ]", "b": [1, 2,],}', {"a": "x, ]", "b": [1, 2]}),
+        ('{"quote": "he said “hi”", "n": 1,}', {"quote": "he said “hi”", "n": 1}),
+        ('{“title”: “Rome”, “note”: "it’s, }"}', {"title": "Rome", "note": "it’s, }"}),
+        ('```json\n{"a": [1, 2,\n', {"a": [1, 2]}),
+        ('{"a": "trunc', {"a": "trunc"}),
+        ('Here: {"a": "b\\"c,]"} Hope that helps!', {"a": 'b"c,]'}),
+        ('{“a”: “say "hi"”}', {"a": 'say "hi"'}),
+        # A closing brace inside a string of a truncated reply
+        ('{"a": "x, }", "b": [1, 2', {"a": "x, }", "b": [1, 2]}),
+        ('[{"a": "}"}, {"b": 2}] trailing {"c": 3}', [{"a": "}"}, {"b": 2}]),
+    ]
+    failed = 0
+    for raw, expected in cases:
+        try:
+            got = json.loads(repair_json(raw))
+        except json.JSONDecodeError as e:
+            got = e
+        if got != expected:
+            failed += 1
+            print(f"FAIL {raw!r} -> {got!r}, expected {expected!r}")
+    print(f"{failed} failed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,205 @@
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------- SETTINGS ----------
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# "jsonl", "sqlite" or "none"
+METRICS_SINK = os.getenv("METRICS_SINK", "jsonl")
+METRICS_PATH = os.getenv(
+    "METRICS_PATH",
+    os.path.join(REPO_ROOT, "metrics.db" if METRICS_SINK == "sqlite" else "metrics.jsonl"),
+)
+# Set METRICS_PORT to serve Prometheus text at http://localhost:<port>/metrics
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+# One-item list that shared.ratelimit adds limiter waits to, set per agent run by Metrics.start
+queue_time = contextvars.ContextVar("queue_time", default=None)
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+FIELDS = (
+    "ts", "app", "agent", "status", "cache", "wall_s", "queue_s", "ttft_s",
+    "input_tokens", "output_tokens", "model", "tokens_saved", "tier",
+)
+
+
+class Metrics:
+    # Records one row per agent run (tagged by app and agent) to a local sink and
+    # keeps running totals for the Prometheus exporter.
+
+    def __init__(self, sink=METRICS_SINK, path=METRICS_PATH):
+        self.app = "unknown"
+        self.sink = sink
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._totals = defaultdict(lambda: {
+            "runs": 0, "errors": 0, "cache_hits": 0, "wall_sum": 0.0, "queue_sum": 0.0,
+            "input_tokens": 0, "output_tokens": 0, "tokens_saved": 0, "buckets": [0] * len(LATENCY_BUCKETS),
+        })
+        # Model calls per (tier, model), for comparing tiers; cache hits aren't model calls
+        self._tier_totals = defaultdict(lambda: {
+            "runs": 0, "escalations": 0, "wall_sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS),
+        })
+        if sink == "sqlite":
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS agent_runs ("
+                "ts REAL, app TEXT, agent TEXT, status TEXT, cache TEXT, wall_s REAL, queue_s REAL,"
+                "ttft_s REAL, input_tokens INTEGER, output_tokens INTEGER, model TEXT, tokens_saved INTEGER, tier TEXT)"
+            )
+            # Databases written before input trimming and model tiers were recorded
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(agent_runs)")}
+            if "tokens_saved" not in columns:
+                self._db.execute("ALTER TABLE agent_runs ADD COLUMN tokens_saved INTEGER DEFAULT 0")
+            if "tier" not in columns:
+                self._db.execute("ALTER TABLE agent_runs ADD COLUMN tier TEXT")
+            self._db.commit()
+
+    def start(self, agent_name):
+        # Queue time from the rate limiter is added to the returned record
+        record = {"agent": agent_name, "started": time.perf_counter(), "queue": [0.0]}
+        queue_time.set(record["queue"])
+        return record
+
+    def finish(self, record, status="ok", cache="miss", ttft=None, usage=None, model=None, tokens_saved=0, tier=None):
+        # tokens_saved: estimated input tokens removed by shared.tokens before the call
+        # tier: the shared.models tier the call ran on
+        row = {
+            "ts": time.time(),
+            "app": self.app,
+            "agent": record["agent"],
+            "status": status,
+            "cache": cache,
+            "wall_s": round(time.perf_counter() - record["started"], 4),
+            "queue_s": round(record["queue"][0], 4),
+            "ttft_s": round(ttft, 4) if ttft is not None else None,
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            "model": model,
+            "tokens_saved": tokens_saved,
+            "tier": tier,
+        }
+        with self._lock:
+            self._add_to_totals(row)
+            if self.sink == "jsonl":
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(row) + "\n")
+            elif self._db is not None:
+                self._db.execute(
+                    f"INSERT INTO agent_runs ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                    [row[field] for field in FIELDS],
+                )
+                self._db.commit()
+        return row
+
+    def _add_to_totals(self, row):
+        totals = self._totals[(row["app"], row["agent"])]
+        totals["runs"] += 1
+        # An escalated attempt was retried on a stronger tier; only the final outcome counts
+        totals["errors"] += row["status"] not in ("ok", "escalated")
+        totals["cache_hits"] += row["cache"] in ("hit", "semantic")
+        totals["wall_sum"] += row["wall_s"]
+        totals["queue_sum"] += row["queue_s"]
+        totals["input_tokens"] += row["input_tokens"]
+        totals["output_tokens"] += row["output_tokens"]
+        totals["tokens_saved"] += row["tokens_saved"]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if row["wall_s"] <= bound:
+                totals["buckets"][i] += 1
+
+        if row["tier"] is None or row["cache"] in ("hit", "semantic"):
+            return
+        tier_totals = self._tier_totals[(row["tier"], row["model"])]
+        tier_totals["runs"] += 1
+        tier_totals["escalations"] += row["status"] == "escalated"
+        tier_totals["wall_sum"] += row["wall_s"]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if row["wall_s"] <= bound:
+                tier_totals["buckets"][i] += 1
+
+    def prometheus_text(self):
+        lines = [
+            "# TYPE agent_run_seconds histogram",
+            "# TYPE agent_queue_seconds_total counter",
+            "# TYPE agent_errors_total counter",
+            "# TYPE agent_cache_hits_total counter",
+            "# TYPE agent_tokens_total counter",
+            "# TYPE agent_input_tokens_saved_total counter",
+            "# TYPE model_tier_run_seconds histogram",
+            "# TYPE model_tier_escalations_total counter",
+        ]
+        with self._lock:
+            for (app, agent), totals in sorted(self._totals.items()):
+                labels = f'app="{app}",agent="{agent}"'
+                for bound, count in zip(LATENCY_BUCKETS, totals["buckets"]):
+                    lines.append(f'agent_run_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'agent_run_seconds_bucket{{{labels},le="+Inf"}} {totals["runs"]}')
+                lines.append(f"agent_run_seconds_sum{{{labels}}} {totals['wall_sum']:.4f}")
+                lines.append(f"agent_run_seconds_count{{{labels}}} {totals['runs']}")
+                lines.append(f"agent_queue_seconds_total{{{labels}}} {totals['queue_sum']:.4f}")
+                lines.append(f"agent_errors_total{{{labels}}} {totals['errors']}")
+                lines.append(f"agent_cache_hits_total{{{labels}}} {totals['cache_hits']}")
+                lines.append(f'agent_tokens_total{{{labels},direction="input"}} {totals["input_tokens"]}')
+                lines.append(f'agent_tokens_total{{{labels},direction="output"}} {totals["output_tokens"]}')
+                lines.append(f"agent_input_tokens_saved_total{{{labels}}} {totals['tokens_saved']}")
+            for (tier, model), totals in sorted(self._tier_totals.items()):
+                labels = f'tier="{tier}",model="{model}"'
+                for bound, count in zip(LATENCY_BUCKETS, totals["buckets"]):
+                    lines.append(f'model_tier_run_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'model_tier_run_seconds_bucket{{{labels},le="+Inf"}} {totals["runs"]}')
+                lines.append(f"model_tier_run_seconds_sum{{{labels}}} {totals['wall_sum']:.4f}")
+                lines.append(f"model_tier_run_seconds_count{{{labels}}} {totals['runs']}")
+                lines.append(f"model_tier_escalations_total{{{labels}}} {totals['escalations']}")
+        return "\n".join(lines) + "\n"
+
+
+def load_rows(sink=METRICS_SINK, path=METRICS_PATH):
+    # Everything recorded so far, for the dashboard
+    if not os.path.exists(path):
+        return []
+    if sink == "sqlite":
+        with sqlite3.connect(path) as db:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute("SELECT * FROM agent_runs")]
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return rows
+
+def start_exporter(port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", int(port)), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+metrics = Metrics()
+if METRICS_PORT:
+    try:
+        start_exporter(METRICS_PORT)
+    except OSError:
+        pass  # another app in this process (or on this host) already serves the port
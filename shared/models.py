@@ -0,0 +1,99 @@
+import dataclasses
+import json
+import os
+import threading
+
+from .connection import MODEL_NAME, get_client
+
+# ---------- SETTINGS ----------
+# Model tiers, cheapest first. Each tier is a model name on BASE_URL. Every
+# tier defaults to MODEL_NAME, so nothing changes until tiers are configured:
+#   MODEL_TIERS='{"fast": "gemini-2.0-flash-lite", "strong": "gemini-2.5-flash"}'
+# or the same settings as a JSON file at MODEL_REGISTRY_PATH:
+#   {"tiers": {...}, "timeouts": {...}, "agents": {"Digest Agent": "fast"}}
+# Environment variables win over the file.
+REGISTRY_PATH = os.getenv("MODEL_REGISTRY_PATH")
+_registry_file = {}
+if REGISTRY_PATH:
+    with open(REGISTRY_PATH, encoding="utf-8") as f:
+        _registry_file = json.load(f)
+
+TIERS = {
+    "fast": MODEL_NAME,
+    "standard": MODEL_NAME,
+    "strong": MODEL_NAME,
+    **_registry_file.get("tiers", {}),
+    **json.loads(os.getenv("MODEL_TIERS", "{}")),
+}
+# Seconds the provider gets to answer one call before it moves to the next
+# tier up; queueing in the rate limiter and retry backoff don't count. Only used
+# when there is a next tier with a different model; the last one waits for
+# HTTP_TIMEOUT like any other call.
+TIER_TIMEOUTS = {
+    "fast": 30,
+    "standard": 60,
+    **_registry_file.get("timeouts", {}),
+    **json.loads(os.getenv("MODEL_TIER_TIMEOUTS", "{}")),
+}
+DEFAULT_TIER = os.getenv("MODEL_DEFAULT_TIER", _registry_file.get("default_tier", "standard"))
+# Agent name -> tier, overriding what the pipelines assign
+TIER_OVERRIDES = {**_registry_file.get("agents", {}), **json.loads(os.getenv("AGENT_MODEL_TIERS", "{}"))}
+
+
+class ModelRegistry:
+    # Picks the model for each agent run. An agent starts on its tier and, on
+    # a timeout or output that fails validation, is retried on the next tier
+    # up (see shared.runner). Every model shares the pooled client and the
+    # rate limiter.
+
+    def __init__(self, tiers=TIERS, timeouts=TIER_TIMEOUTS, default_tier=DEFAULT_TIER):
+        self.tiers = dict(tiers)
+        self.timeouts = dict(timeouts)
+        self.default_tier = default_tier
+        self.agent_tiers = {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def set_tier(self, agent_name, tier):
+        self.agent_tiers[agent_name] = tier
+
+    def tier_for(self, agent_name):
+        tier = TIER_OVERRIDES.get(agent_name, self.agent_tiers.get(agent_name, self.default_tier))
+        return tier if tier in self.tiers else self.default_tier
+
+    def chain(self, agent_name):
+        # [(tier, model name)] from the agent's tier up. A tier with the same
+        # model as an earlier one is skipped; retrying it would not help.
+        order = list(self.tiers)
+        chain = []
+        for tier in order[order.index(self.tier_for(agent_name)):]:
+            if all(self.tiers[tier] != name for _, name in chain):
+                chain.append((tier, self.tiers[tier]))
+        return chain
+
+    def timeout(self, tier):
+        return self.timeouts.get(tier) or None
+
+    def model(self, model_name):
+        # One rate-limited model per name, built on first use
+        client = get_client()
+        if model_name == MODEL_NAME:
+            return client.model
+        with self._lock:
+            if model_name not in self._models:
+                from agents import OpenAIChatCompletionsModel
+
+                from .ratelimit import RateLimitedModel, limiter
+
+                self._models[model_name] = RateLimitedModel(
+                    OpenAIChatCompletionsModel(model=model_name, openai_client=client.external_client),
+                    limiter,
+                )
+            return self._models[model_name]
+
+    def run_config(self, run_config, model_name):
+        # run_config with its model swapped; RunConfig.model applies to every agent in the run
+        return dataclasses.replace(run_config, model=self.model(model_name))
+
+
+model_registry = ModelRegistry()
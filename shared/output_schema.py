@@ -0,0 +1,41 @@
+import json
+
+from agents import AgentOutputSchema
+from agents.exceptions import ModelBehaviorError
+
+from .jsonrepair import repair_json
+
+# Structured agent output that survives small JSON mistakes. Use it as
+#   Agent(..., output_type=RepairingOutputSchema(MyModel))
+# and the run returns a validated MyModel instance.
+
+
+class UnparsableOutput(ModelBehaviorError):
+    # Raised when the output is still invalid after local repairs; .text is the raw output
+    def __init__(self, message, text):
+        super().__init__(message)
+        self.text = text
+
+
+class RepairingOutputSchema(AgentOutputSchema):
+    # Validates like AgentOutputSchema, but a code fence, a trailing comma or
+    # a reply cut off mid-object is fixed locally (shared.jsonrepair) instead
+    # of failing the run and costing another model call.
+
+    def validate_json(self, json_str):
+        try:
+            return super().validate_json(json_str)
+        except ModelBehaviorError as e:
+            # Valid JSON that doesn't fit the schema has nothing to repair
+            repaired = repair_json(json_str)
+            if repaired == json_str:
+                raise UnparsableOutput(e.message, json_str) from e
+            try:
+                return super().validate_json(repaired)
+            except ModelBehaviorError:
+                raise UnparsableOutput(e.message, json_str) from e
+
+    def __repr__(self):
+        # Part of the response cache key, so it must be the same in every
+        # process and change whenever the schema does
+        return f"RepairingOutputSchema({json.dumps(self.json_schema(), sort_keys=True)})"
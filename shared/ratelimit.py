@@ -0,0 +1,246 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+
+import openai
+from agents.models.interface import Model
+
+from .metrics import queue_time
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# ---------- SETTINGS ----------
+# Provider limits to stay under; 0 (the default) means no limit, so calls are
+# only throttled once a deployment sets them, e.g. MODEL_RPM=15
+REQUESTS_PER_MINUTE = float(os.getenv("MODEL_RPM", "0"))
+TOKENS_PER_MINUTE = float(os.getenv("MODEL_TPM", "0"))
+MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = float(os.getenv("MODEL_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("MODEL_RETRY_MAX_DELAY", "60"))
+# Output tokens assumed per call when reserving tokens-per-minute up front
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("MODEL_EXPECTED_OUTPUT_TOKENS", "800"))
+
+# Lower runs first
+INTERACTIVE = 0
+BATCH = 10
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+_call_timeout = contextvars.ContextVar("call_timeout", default=None)
+
+
+@contextmanager
+def request_priority(priority):
+    # Model calls made inside this block (and tasks started from it) queue at this priority
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def call_timeout(seconds):
+    # Model calls made inside this block raise TimeoutError when the provider
+    # takes longer than this. Time spent queued in the limiter or backing off
+    # between retries doesn't count. None means no limit.
+    token = _call_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _call_timeout.reset(token)
+
+
+class TokenBucket:
+    # per_minute <= 0 is a bucket that never runs dry
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self):
+        return self.per_minute <= 0
+
+    def refill(self, rate_factor):
+        if self.unlimited:
+            return
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute * rate_factor / 60)
+        self.updated = now
+
+    def wait_time(self, amount, rate_factor):
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / (self.per_minute * rate_factor)
+
+
+class RateLimiter:
+    # Requests/min and tokens/min buckets shared by every agent call, served in
+    # priority order. After a 429 the refill rate is cut and then slowly restored.
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.rate_factor = 1.0
+        self.stats = {"granted": 0, "retries": 0, "rate_limited": 0, "queued_seconds": 0.0}
+        self._waiters = []  # heap of (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._drainer = None
+
+    def configure(self, requests_per_minute=None, tokens_per_minute=None):
+        if requests_per_minute:
+            self.requests = TokenBucket(requests_per_minute)
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens):
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = (_priority.get(), next(self._seq), tokens, future)
+        heapq.heappush(self._waiters, entry)
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.ensure_future(self._drain())
+        try:
+            await future
+        except asyncio.CancelledError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+        waited = time.monotonic() - started
+        self.stats["queued_seconds"] += waited
+        total = queue_time.get()
+        if total is not None:
+            total[0] += waited
+        return waited
+
+    async def _drain(self):
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            self.requests.refill(self.rate_factor)
+            self.tokens.refill(self.rate_factor)
+            wait = max(self.requests.wait_time(1, self.rate_factor), self.tokens.wait_time(tokens, self.rate_factor))
+            if wait > 0:
+                # Wake up regularly so a newly queued interactive call can jump ahead
+                await asyncio.sleep(min(wait, 0.5))
+                continue
+            heapq.heappop(self._waiters)
+            self.requests.level -= 1
+            self.tokens.level -= min(tokens, self.tokens.capacity)
+            self.stats["granted"] += 1
+            future.set_result(None)
+
+    def settle(self, estimated, actual):
+        # Charge the difference once the real usage is known
+        if actual:
+            self.tokens.level -= actual - estimated
+
+    def penalize(self):
+        self.stats["rate_limited"] += 1
+        self.rate_factor = max(0.25, self.rate_factor * 0.75)
+        self.requests.level = min(self.requests.level, 0)
+
+    def reward(self):
+        self.rate_factor = min(1.0, self.rate_factor + 0.02)
+
+
+def retry_delay(attempt, error):
+    retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+    if retry_after:
+        try:
+            return min(RETRY_MAX_DELAY, float(retry_after))
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class RateLimitedModel(Model):
+    # Wraps a model so every call goes through the limiter and transient
+    # provider errors are retried with jittered exponential backoff.
+
+    def __init__(self, model, limiter):
+        self.inner = model
+        self.limiter = limiter
+        self.model = getattr(model, "model", repr(model))
+
+    def _estimate(self, system_instructions, input, model_settings):
+        max_tokens = getattr(model_settings, "max_tokens", None) or EXPECTED_OUTPUT_TOKENS
+        return estimate_tokens(system_instructions, input) + max_tokens
+
+    def _failed(self, attempt, error):
+        if isinstance(error, openai.RateLimitError):
+            self.limiter.penalize()
+        self.limiter.stats["retries"] += 1
+        delay = retry_delay(attempt, error)
+        logger.warning("%s: %s, retrying in %.1fs (attempt %d/%d)", self.model, type(error).__name__, delay, attempt + 1, MAX_RETRIES)
+        return delay
+
+    async def get_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        estimated = self._estimate(system_instructions, input, model_settings)
+        for attempt in range(MAX_RETRIES + 1):
+            await self.limiter.acquire(estimated)
+            try:
+                async with asyncio.timeout(_call_timeout.get()):
+                    response = await self.inner.get_response(system_instructions, input, model_settings, *args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(self._failed(attempt, e))
+                continue
+            self.limiter.reward()
+            usage = getattr(response, "usage", None)
+            self.limiter.settle(estimated, getattr(usage, "total_tokens", 0))
+            return response
+
+    async def stream_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        estimated = self._estimate(system_instructions, input, model_settings)
+        for attempt in range(MAX_RETRIES + 1):
+            await self.limiter.acquire(estimated)
+            started = False
+            timeout = _call_timeout.get()
+            deadline = timeout and asyncio.get_running_loop().time() + timeout
+            stream = self.inner.stream_response(system_instructions, input, model_settings, *args, **kwargs)
+            try:
+                while True:
+                    # The deadline covers the provider, not the caller handling each event
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            event = await anext(stream)
+                    except StopAsyncIteration:
+                        break
+                    started = True
+                    yield event
+            except RETRYABLE_ERRORS as e:
+                # Once tokens have reached the caller the stream can't be replayed
+                if started or attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(self._failed(attempt, e))
+                continue
+            self.limiter.reward()
+            return
+
+
+limiter = RateLimiter()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import time
+
+from agents import Runner
+from agents.exceptions import ModelBehaviorError
+from openai.types.responses import ResponseTextDeltaEvent
+
+from .cache import agent_cache, is_hit
+from .connection import dispatch
+from .metrics import metrics
+from .models import model_registry
+from .ratelimit import call_timeout
+from .tokens import token_budget
+
+logger = logging.getLogger(__name__)
+
+# Set STREAM_OUTPUT=0 to fall back to blocking runs everywhere
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "1") != "0"
+# Minimum seconds between UI refreshes while tokens are arriving
+STREAM_REFRESH = float(os.getenv("STREAM_REFRESH", "0.05"))
+
+
+def model_name_for(agent, run_config):
+    model = agent.model or (run_config.model if run_config else None)
+    return model if isinstance(model, str) else getattr(model, "model", repr(model))
+
+def model_chain(agent, run_config):
+    # [(tier, model name)] to try in order; an agent with its own model isn't tiered
+    if agent.model or run_config is None:
+        return [(None, model_name_for(agent, run_config))]
+    return model_registry.chain(agent.name)
+
+async def run_agent(agent, input, run_config, on_text=None, cache=agent_cache):
+    # Runner.run with a content-addressed cache in front; returns final_output.
+    # When on_text is given, tokens are streamed to it (on the caller's thread)
+    # as they arrive, with the text received so far. Every call is recorded in
+    # shared.metrics. The input is first fitted to the agent's token cap
+    # (shared.tokens), so the cache key and the request both see the trimmed input.
+    # The model comes from shared.models: the agent's tier first, then the
+    # tiers above it when a run times out or returns output that fails validation.
+    # cache is an AgentCache; a pipeline can pass its own, e.g. one on disk.
+    record = metrics.start(agent.name)
+    input, saved = token_budget.apply(agent.name, input)
+    chain = model_chain(agent, run_config)
+    # Keyed by the first model in the chain, whichever tier ends up answering
+    key = cache.make_key(agent, input, chain[0][1])
+    cached = cache.get(key)
+    if is_hit(cached):
+        metrics.finish(record, cache="hit", model=chain[0][1], tier=chain[0][0], tokens_saved=saved)
+        if on_text and isinstance(cached, str):
+            dispatch(on_text, cached)
+        return cached
+
+    cache_status = "miss" if cache.ttl_for(agent.name) > 0 else "off"
+    for attempt, (tier, model_name) in enumerate(chain):
+        last = attempt == len(chain) - 1
+        config = model_registry.run_config(run_config, model_name) if tier else run_config
+        # Per provider call, so waiting on the rate limiter doesn't escalate
+        timeout = None if last else model_registry.timeout(tier)
+        ttft = None
+        try:
+            with call_timeout(timeout):
+                if on_text and STREAM_OUTPUT:
+                    result, ttft = await _run_streamed(agent, input, config, on_text)
+                else:
+                    result = await Runner.run(
+                        starting_agent=agent,
+                        input=input,
+                        run_config=config,
+                    )
+        except asyncio.CancelledError:
+            # e.g. a speculative run that turned out not to be needed
+            metrics.finish(record, status="cancelled", cache=cache_status, model=model_name, tier=tier, tokens_saved=saved)
+            raise
+        except (asyncio.TimeoutError, ModelBehaviorError) as e:
+            if last:
+                metrics.finish(record, status="error", cache=cache_status, model=model_name, tier=tier, tokens_saved=saved)
+                raise
+            # Each attempt is its own metrics row, so latency per tier stays accurate
+            logger.warning("%s: %s on %s (%s tier), trying %s", agent.name, type(e).__name__, model_name, tier, chain[attempt + 1][1])
+            metrics.finish(record, status="escalated", cache=cache_status, model=model_name, tier=tier, tokens_saved=saved)
+            record, saved = metrics.start(agent.name), 0
+            continue
+        except Exception:
+            metrics.finish(record, status="error", cache=cache_status, model=model_name, tier=tier, tokens_saved=saved)
+            raise
+        break
+
+    metrics.finish(
+        record,
+        cache=cache_status,
+        ttft=ttft,
+        usage=getattr(result.context_wrapper, "usage", None),
+        model=model_name,
+        tier=tier,
+        tokens_saved=saved,
+    )
+    cache.put(key, agent.name, result.final_output)
+    return result.final_output
+
+async def _run_streamed(agent, input, run_config, on_text):
+    # Returns (result, seconds to first token)
+    started = time.perf_counter()
+    ttft = None
+    last_refresh = 0.0
+    text = ""
+
+    result = Runner.run_streamed(
+        starting_agent=agent,
+        input=input,
+        run_config=run_config,
+    )
+    async for event in result.stream_events():
+        if event.type != "raw_response_event" or not isinstance(event.data, ResponseTextDeltaEvent):
+            continue
+        now = time.perf_counter()
+        if ttft is None:
+            ttft = now - started
+            logger.info("%s: time to first token %.3fs", agent.name, ttft)
+        text += event.data.delta
+        if now - last_refresh >= STREAM_REFRESH:
+            last_refresh = now
+            dispatch(on_text, text)
+
+    if asyncio.current_task().cancelling():
+        # stream_events() ends quietly when cancelled; pass the cancellation on
+        # so a cancelled job doesn't return partial output
+        raise asyncio.CancelledError()
+    if isinstance(result.final_output, str):
+        dispatch(on_text, result.final_output)
+    logger.info("%s: finished in %.3fs", agent.name, time.perf_counter() - started)
+    return result, ttft
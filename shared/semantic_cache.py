@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+from .metrics import metrics
+
+# ---------- SETTINGS ----------
+# Set SEMANTIC_CACHE_ENABLED=0 to turn it off, e.g. for benchmarks
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") != "0"
+# Cosine similarity a stored query needs to be reused, for caches without
+# their own threshold. bench/semantic_eval.py checks a threshold against
+# labelled pairs of questions.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+# Per-cache overrides, e.g. {"Support Answers": 0.75}
+THRESHOLD_OVERRIDES = json.loads(os.getenv("SEMANTIC_CACHE_THRESHOLDS", "{}"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 3600)))
+# Width of the hashed n-gram vectors
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+# Optional sentence-transformers model (e.g. paraphrase-multilingual-MiniLM-L12-v2)
+# used instead of the n-gram vectors; needs pip install sentence-transformers
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL")
+
+WORD_RE = re.compile(r"\w+")
+NUMBER_RE = re.compile(r"\d+")
+
+# NumPy is imported on first use, so an app whose cache is turned off never loads it
+np = None
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+
+
+# ---------- EMBEDDERS ----------
+class HashingEmbedder:
+    # Words, word pairs and character trigrams hashed into a fixed-width
+    # vector. Trigrams let "deliver" match "delivery" and survive typos;
+    # stopwords are dropped so "how long is" doesn't count as a match. Word
+    # pairs weigh as much as words, so "paris to nice" and "nice to lyon"
+    # stay apart although they share a city.
+
+    def __init__(self, dim=SEMANTIC_CACHE_DIM, stopwords=()):
+        self.dim = dim
+        self.stopwords = frozenset(stopwords)
+
+    def features(self, text):
+        words = []
+        for word in WORD_RE.findall(text.lower()):
+            if word in self.stopwords:
+                continue
+            # Crude plural folding, as in the support FAQ index: "mondays" -> "monday"
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            words.append(word)
+        features = {}
+        for word in words:
+            features[f"w:{word}"] = features.get(f"w:{word}", 0.0) + 1.0
+            padded = f"<{word}>"
+            grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for gram in grams:
+                # Long words shouldn't outweigh short ones just by having more trigrams
+                features[f"c:{gram}"] = features.get(f"c:{gram}", 0.0) + 1.0 / len(grams)
+        for first, second in zip(words, words[1:]):
+            features[f"b:{first}_{second}"] = features.get(f"b:{first}_{second}", 0.0) + 1.0
+        return features
+
+    def encode(self, texts):
+        _load_numpy()
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self.features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                # The low bit picks a sign so collisions tend to cancel out
+                vectors[row, (h >> 1) % self.dim] += weight if h & 1 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceEmbedder:
+    def __init__(self, model_name=SEMANTIC_CACHE_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "SEMANTIC_CACHE_MODEL needs the sentence-transformers package: pip install sentence-transformers"
+            ) from e
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        _load_numpy()
+        return self._model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+_sentence_embedder = None
+_sentence_lock = threading.Lock()
+
+def make_embedder(stopwords=()):
+    # One model instance per process; it's large and slow to load
+    global _sentence_embedder
+    if not SEMANTIC_CACHE_MODEL:
+        return HashingEmbedder(stopwords=stopwords)
+    with _sentence_lock:
+        if _sentence_embedder is None:
+            _sentence_embedder = SentenceEmbedder()
+    return _sentence_embedder
+
+
+# ---------- CACHE ----------
+def scope_id(scope):
+    # Scopes are compared as 64-bit hashes so they fit in a NumPy column
+    return int.from_bytes(hashlib.blake2b(scope.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def file_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+
+class SemanticCache:
+    # Reuses an earlier answer when a new query means the same thing. Stored
+    # queries are rows of one NumPy matrix, so a lookup is a single
+    # matrix-vector product. Entries only match within the same scope (e.g.
+    # the trip a question is about), queries that mention different numbers
+    # (order IDs, dates, amounts) never match, and everything is dropped when
+    # one of the source files the answers depend on changes.
+
+    def __init__(self, name, sources=(), stopwords=(), threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, ttl=SEMANTIC_CACHE_TTL, enabled=SEMANTIC_CACHE_ENABLED):
+        self.name = name
+        self.sources = list(sources)
+        self.stopwords = stopwords
+        self.threshold = THRESHOLD_OVERRIDES.get(name, threshold)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+        self._embedder = None
+        self._vectors = None
+        self._source_state = self._stat_sources()
+        self._version = file_digest(self.sources)
+        self._reset()
+
+    def _reset(self):
+        if not self.enabled:
+            return
+        _load_numpy()
+        self._queries = [None] * self.max_entries
+        self._slots = {}  # (scope id, query) -> row
+        self._answers = [None] * self.max_entries
+        self._scopes = np.zeros(self.max_entries, dtype=np.int64)
+        self._expires = np.zeros(self.max_entries)  # 0 = empty slot
+        self._last_used = np.zeros(self.max_entries)
+
+    def _embed(self, text):
+        # The embedder (and for SEMANTIC_CACHE_MODEL, the model) loads on first use
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    embedder = make_embedder(self.stopwords)
+                    self._vectors = np.zeros((self.max_entries, embedder.dim), dtype=np.float32)
+                    self._embedder = embedder
+        return self._embedder.encode([text])[0]
+
+    def _stat_sources(self):
+        state = []
+        for path in self.sources:
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                state.append(None)
+        return state
+
+    def _check_sources(self):
+        # A stat per lookup; the files are only re-read when one was touched
+        state = self._stat_sources()
+        if state == self._source_state:
+            return
+        self._source_state = state
+        version = file_digest(self.sources)
+        if version != self._version:
+            self._version = version
+            self._invalidate()
+
+    def _candidates(self, vector, scope, top_k):
+        # [(similarity, slot)] best first among live entries in the scope
+        live = (self._expires > time.time()) & (self._scopes == scope_id(scope))
+        if not live.any():
+            return []
+        similarities = np.where(live, self._vectors @ vector, -1.0)
+        count = min(top_k, int(live.sum()))
+        best = np.argpartition(-similarities, count - 1)[:count]
+        best = best[np.argsort(-similarities[best])]
+        return [(float(similarities[slot]), int(slot)) for slot in best]
+
+    def search(self, query, scope="", top_k=3):
+        # Returns [(similarity, stored query, answer)] best first, ignoring the threshold
+        if not self.enabled:
+            return []
+        vector = self._embed(query)
+        with self._lock:
+            self._check_sources()
+            return [
+                (similarity, self._queries[slot], self._answers[slot])
+                for similarity, slot in self._candidates(vector, scope, top_k)
+            ]
+
+    def get(self, query, scope=""):
+        # The stored answer for the closest query above the threshold, or None.
+        # Hits are recorded in shared.metrics under this cache's name.
+        if not self.enabled:
+            return None
+        record = metrics.start(self.name)
+        vector = self._embed(query)
+        numbers = sorted(NUMBER_RE.findall(query))
+        with self._lock:
+            self._check_sources()
+            slot = next(
+                (
+                    slot for similarity, slot in self._candidates(vector, scope, top_k=3)
+                    if similarity >= self.threshold and sorted(NUMBER_RE.findall(self._queries[slot])) == numbers
+                ),
+                None,
+            )
+            if slot is None:
+                self.stats["misses"] += 1
+                return None
+            self._last_used[slot] = time.time()
+            self.stats["hits"] += 1
+            answer = self._answers[slot]
+        metrics.finish(record, cache="semantic")
+        return answer
+
+    def put(self, query, answer, scope=""):
+        if not self.enabled or self.ttl <= 0:
+            return
+        vector = self._embed(query)
+        now = time.time()
+        with self._lock:
+            self._check_sources()
+            # Reuse the slot of the same query, else an empty or expired one, else the least recently used
+            sid = scope_id(scope)
+            slot = self._slots.get((sid, query))
+            if slot is None:
+                slot = int(np.argmin(np.where(self._expires > now, self._last_used, -1.0)))
+                if self._expires[slot] > now:
+                    self.stats["evictions"] += 1
+                self._slots.pop((int(self._scopes[slot]), self._queries[slot]), None)
+                self._slots[(sid, query)] = slot
+            self._vectors[slot] = vector
+            self._queries[slot] = query
+            self._answers[slot] = answer
+            self._scopes[slot] = sid
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+
+    def invalidate(self):
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        self._reset()
+        self.stats["invalidations"] += 1
+
+    def __len__(self):
+        if not self.enabled:
+            return 0
+        return int((self._expires > time.time()).sum())
@@ -0,0 +1,48 @@
+import secrets
+
+from .metrics import metrics
+
+# Streamlit helpers around shared.session_store. The session ID lives in the
+# page URL (?sid=...), so a refresh, a reconnect or a restarted server picks
+# the same results back up. Streamlit and the store are imported on first use
+# so pipelines and CLIs that import the app's connection.py don't pay for them.
+
+
+def session_id():
+    import streamlit as st
+
+    sid = st.query_params.get("sid")
+    if not sid:
+        sid = secrets.token_urlsafe(16)
+        st.query_params["sid"] = sid
+    return sid
+
+def _store_key():
+    return f"{metrics.app}:{session_id()}"
+
+def restore_session():
+    # Call at the top of main.py. Loads the saved results into st.session_state
+    # once per browser session; later reruns already have them.
+    import streamlit as st
+    from .session_store import session_store
+
+    if st.session_state.get("_session_restored"):
+        return
+    st.session_state._session_restored = True
+    saved = session_store.get(_store_key())
+    if saved:
+        for key, value in saved.items():
+            st.session_state.setdefault(key, value)
+        st.session_state._session_keys = list(saved)
+
+def save_session(**values):
+    # Sets st.session_state[key] = value for each value and persists every key
+    # saved so far. Values must be JSON-serializable.
+    import streamlit as st
+    from .session_store import session_store
+
+    keys = set(st.session_state.get("_session_keys", [])) | set(values)
+    for key, value in values.items():
+        st.session_state[key] = value
+    st.session_state._session_keys = sorted(keys)
+    session_store.put(_store_key(), {key: st.session_state[key] for key in keys if key in st.session_state})
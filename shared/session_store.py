@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ---------- SETTINGS ----------
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# "sqlite", "redis" or "none"
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_PATH = os.getenv("SESSION_PATH", os.path.join(REPO_ROOT, "sessions.db"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Total size of all stored sessions; the least recently used are evicted past it
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+# Sessions not touched for this many seconds are dropped
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+
+
+class SqliteSessionStore:
+    # Sessions are JSON documents keyed by "<app>:<session id>". Several
+    # replicas can share one file; WAL mode lets readers and a writer overlap.
+
+    def __init__(self, path=SESSION_PATH, max_bytes=SESSION_MAX_BYTES, ttl=SESSION_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM sessions WHERE key = ? AND last_used > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE sessions SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, state):
+        value = json.dumps(state, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now),
+            )
+            # Drop expired sessions, then the least recently used ones past max_bytes
+            self._db.execute("DELETE FROM sessions WHERE last_used <= ?", (now - self.ttl,))
+            self._db.execute(
+                "DELETE FROM sessions WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS total FROM sessions) "
+                "WHERE total > ?)",
+                (self.max_bytes,),
+            )
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE key = ?", (key,))
+            self._db.commit()
+
+
+class RedisSessionStore:
+    # Same interface on a Redis-compatible server. Sizes and last-used times
+    # are tracked in a hash and a sorted set so eviction works the same way
+    # for every replica sharing the server.
+
+    def __init__(self, url=SESSION_REDIS_URL, max_bytes=SESSION_MAX_BYTES, ttl=SESSION_TTL):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis needs the redis package: pip install redis") from e
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._redis.get(f"session:{key}")
+        if value is None:
+            return None
+        self._redis.expire(f"session:{key}", int(self.ttl))
+        self._redis.zadd("session:lru", {key: time.time()})
+        return json.loads(value)
+
+    def put(self, key, state):
+        value = json.dumps(state, ensure_ascii=False)
+        pipe = self._redis.pipeline()
+        pipe.set(f"session:{key}", value, ex=int(self.ttl))
+        pipe.zadd("session:lru", {key: time.time()})
+        pipe.hset("session:sizes", key, len(value.encode("utf-8")))
+        pipe.execute()
+        self._evict()
+
+    def delete(self, key):
+        pipe = self._redis.pipeline()
+        pipe.delete(f"session:{key}")
+        pipe.zrem("session:lru", key)
+        pipe.hdel("session:sizes", key)
+        pipe.execute()
+
+    def _evict(self):
+        # Forget sessions Redis already expired, then pop the oldest until the total fits
+        for key in self._redis.zrangebyscore("session:lru", 0, time.time() - self.ttl):
+            self.delete(key.decode())
+        total = sum(int(size) for size in self._redis.hvals("session:sizes"))
+        while total > self.max_bytes:
+            oldest = self._redis.zpopmin("session:lru")
+            if not oldest:
+                break
+            key = oldest[0][0].decode()
+            total -= int(self._redis.hget("session:sizes", key) or 0)
+            self.delete(key)
+
+
+class NullSessionStore:
+    def get(self, key):
+        return None
+
+    def put(self, key, state):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+def make_session_store(backend=SESSION_BACKEND):
+    if backend == "redis":
+        return RedisSessionStore()
+    if backend == "none":
+        return NullSessionStore()
+    return SqliteSessionStore()
+
+
+session_store = make_session_store()
@@ -0,0 +1,30 @@
+import importlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Each main.py draws its page before importing its pipeline, which pulls in
+# the agents SDK, and imports it only where it's first used. preload(), called
+# at the top of every main.py, starts those imports on a background thread the
+# first time the page is shown, so they are usually finished by the time the
+# user submits. An import in the script that is still in progress just waits
+# for the background one.
+_started = set()
+_lock = threading.Lock()
+
+
+def preload(*module_names):
+    with _lock:
+        names = [name for name in module_names if name not in _started]
+        _started.update(names)
+    if names:
+        threading.Thread(target=_import_all, args=(names,), name="preload", daemon=True).start()
+
+def _import_all(names):
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # The import in the script raises the same error where the user sees it
+            logger.exception("Preloading %s failed", name)
@@ -0,0 +1,181 @@
+import json
+import os
+import re
+from collections import Counter
+
+# Local token estimate used for budgeting (rate limiter, chunking, speculation).
+# ~4 characters per token is close enough without a tokenizer dependency.
+
+# ---------- SETTINGS ----------
+# Set INPUT_BUDGET_ENABLED=0 to send agent input exactly as built
+INPUT_BUDGET_ENABLED = os.getenv("INPUT_BUDGET_ENABLED", "1") != "0"
+# Input cap in tokens for agents without their own; 0 means no cap
+DEFAULT_INPUT_CAP = int(os.getenv("INPUT_TOKEN_CAP", "0"))
+# Per-agent overrides, e.g. {"Budget Agent": 1000}. 0 removes an agent's cap.
+CAP_OVERRIDES = json.loads(os.getenv("INPUT_TOKEN_CAPS", "{}"))
+
+OMITTED = "[...]"
+
+# Lines kept first when trimming: markdown headings, bold labels, short
+# "Label:" lines, and function/class signatures in common languages
+HEADING_RE = re.compile(
+    r"^\s{0,3}(#{1,6}\s|\*\*[^*]+\*\*|[A-Z][\w /&()-]{0,60}:\s*$)"
+    r"|^\s*(export\s+)?(async\s+)?(def|class|function|func|fn|interface|struct|enum|impl|trait|module|package)\s"
+    r"|^\s*(public|private|protected|internal|static)\s.*[({]\s*$"
+)
+# Page numbers and similar PDF furniture
+PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?\d+(\s*(of|/)\s*\d+)?\s*$", re.IGNORECASE)
+WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(*parts):
+    text = "".join(part if isinstance(part, str) else json.dumps(part, default=str) for part in parts if part)
+    return len(text) // 4 + 1
+
+
+# ---------- TRIMMING ----------
+def squeeze_whitespace(text, code=False):
+    # Trailing spaces go, runs of spaces inside a line become one, and blank
+    # lines collapse to one. Indentation is kept. For code, spaces inside a
+    # line are left alone too: they can sit in string literals or alignment.
+    lines = []
+    for line in text.splitlines():
+        if code:
+            line = line.rstrip()
+        else:
+            body = line.lstrip(" \t")
+            line = line[:len(line) - len(body)] + re.sub(r"[ \t]{2,}", " ", body.rstrip())
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip("\n")
+
+def drop_boilerplate(lines):
+    # Page numbers, and short lines repeated three or more times (running
+    # headers and footers of a PDF). Headings and signatures always stay.
+    counts = Counter(line.strip() for line in lines)
+    return [
+        line for line in lines
+        if HEADING_RE.match(line) or not (
+            PAGE_NUMBER_RE.match(line)
+            or (counts[line.strip()] >= 3 and len(line) <= 80 and len(WORD_RE.findall(line)) >= 2)
+        )
+    ]
+
+def trim_text(text, max_tokens, code=False):
+    # Fits text into max_tokens: boilerplate is dropped first, then headings
+    # and signatures are kept and every section keeps its first lines, round
+    # robin, until the budget is spent. Gaps are marked with OMITTED.
+    text = squeeze_whitespace(text, code)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lines = drop_boilerplate(text.splitlines())
+    if estimate_tokens("\n".join(lines)) <= max_tokens:
+        return "\n".join(lines)
+
+    headings = [bool(HEADING_RE.match(line)) for line in lines]
+    keep = [False] * len(lines)
+    budget = max_tokens
+    # Headings first, in document order, as far as they fit
+    for i, line in enumerate(lines):
+        if headings[i]:
+            cost = estimate_tokens(line)
+            if cost <= budget:
+                keep[i] = True
+                budget -= cost
+    # Then body lines by their position within their section, so the first
+    # line of every section goes in before the second line of any
+    ranked = []
+    position = 0
+    for i, line in enumerate(lines):
+        if headings[i]:
+            position = 0
+        elif line:
+            ranked.append((position, i))
+            position += 1
+    for _, i in sorted(ranked):
+        cost = estimate_tokens(lines[i])
+        # Room is left for the gap markers
+        if cost + estimate_tokens(OMITTED) <= budget:
+            keep[i] = True
+            budget -= cost + estimate_tokens(OMITTED)
+
+    kept = []
+    for line, keep_line in zip(lines, keep):
+        if keep_line:
+            kept.append(line)
+        elif not line:
+            # Blank lines between kept lines stay, so code keeps its shape
+            if kept and kept[-1] not in ("", OMITTED):
+                kept.append("")
+        elif not kept or kept[-1] != OMITTED:
+            if kept and kept[-1] == "":
+                kept.pop()
+            kept.append(OMITTED)
+    trimmed = "\n".join(kept)
+    if not any(keep):
+        # One huge line: plain truncation is all that's left
+        trimmed = text[:max(0, max_tokens - 2) * 4] + OMITTED
+    return trimmed
+
+
+# ---------- BUDGET ----------
+def has_text(item):
+    return isinstance(item, dict) and isinstance(item.get("content"), str)
+
+def input_tokens(items):
+    # Message text only, so trimming a message by N tokens lowers this by about N
+    return sum(estimate_tokens(item["content"]) if has_text(item) else estimate_tokens(item) for item in items)
+
+
+class TokenBudget:
+    # Per-agent input caps, applied by shared.runner before every call (and
+    # before the cache key is made, so trimmed inputs still hit the cache).
+
+    def __init__(self, default_cap=DEFAULT_INPUT_CAP, enabled=INPUT_BUDGET_ENABLED):
+        self.default_cap = default_cap
+        self.enabled = enabled
+        self.caps = {}
+        self.code_agents = set()
+
+    def set_cap(self, agent_name, tokens):
+        self.caps[agent_name] = tokens
+
+    def set_code(self, agent_name):
+        # The agent reads source code: only trailing spaces and extra blank
+        # lines are removed from its input
+        self.code_agents.add(agent_name)
+
+    def cap_for(self, agent_name):
+        return CAP_OVERRIDES.get(agent_name, self.caps.get(agent_name, self.default_cap))
+
+    def apply(self, agent_name, input):
+        # Returns (input, estimated tokens saved). Whitespace is always
+        # squeezed; over the cap, the longest messages are trimmed (the last
+        # one, usually the actual question, only if nothing else is left).
+        if not self.enabled:
+            return input, 0
+        if isinstance(input, str):
+            trimmed = self.apply(agent_name, [{"role": "user", "content": input}])
+            return trimmed[0][0]["content"], trimmed[1]
+
+        before = input_tokens(input)
+        code = agent_name in self.code_agents
+        items = [
+            {**item, "content": squeeze_whitespace(item["content"], code)} if has_text(item) else item
+            for item in input
+        ]
+        cap = self.cap_for(agent_name)
+        if cap > 0:
+            trimmable = [i for i, item in enumerate(items) if has_text(item)]
+            last = trimmable[-1] if trimmable else None
+            trimmable.sort(key=lambda i: (i == last, -len(items[i]["content"])))
+            for i in trimmable:
+                excess = input_tokens(items) - cap
+                if excess <= 0:
+                    break
+                size = estimate_tokens(items[i]["content"])
+                items[i] = {**items[i], "content": trim_text(items[i]["content"], max(size - excess, 1), code)}
+        return items, max(0, before - input_tokens(items))
+
+
+token_budget = TokenBudget()
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+
+# Runs one app's pipeline jobs from the shared job queue (see shared/jobs.py):
+#   python -m shared.worker News-Digest-Generator --concurrency 4
+# Start as many worker processes per app as needed, on any host that can
+# reach JOBS_PATH. Each process has its own rate limiter, so split MODEL_RPM
+# and MODEL_TPM between them.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+logger = logging.getLogger("shared.worker")
+
+
+def load_app(app):
+    # The app's connection.py loads its .env, so it has to be imported before
+    # anything that reads settings at import time
+    app_dir = os.path.join(REPO_ROOT, os.path.basename(app.rstrip("/")))
+    if not os.path.isfile(os.path.join(app_dir, "connection.py")):
+        raise SystemExit(f"{app} is not an app folder")
+    sys.path.insert(0, app_dir)
+    importlib.import_module("connection")
+
+async def run_one(handler, job, progress):
+    def on_text(key, text):
+        progress[key] = text
+    return await handler(job["input"], on_text)
+
+async def work(app, concurrency, worker, running):
+    # running maps job ID -> (task, progress) for the caller to hand back on shutdown
+    from .jobs import CANCELLED, DONE, ERROR, JOB_POLL_INTERVAL, get_queue, handlers
+
+    queue = get_queue()
+    job_handlers = handlers()
+    kinds = list(job_handlers)
+    logger.info("%s: serving %s jobs (%s) for %s", worker, concurrency, ", ".join(kinds), app)
+
+    while True:
+        while len(running) < concurrency:
+            job = await asyncio.to_thread(queue.claim, app, kinds, worker)
+            if job is None:
+                break
+            progress = {}
+            task = asyncio.create_task(run_one(job_handlers[job["kind"]], job, progress))
+            running[job["id"]] = (task, progress)
+            logger.info("%s: started %s job %s", worker, job["kind"], job["id"])
+
+        for job_id, (task, progress) in list(running.items()):
+            if task.done():
+                del running[job_id]
+                if task.cancelled():
+                    await asyncio.to_thread(queue.finish, job_id, worker, CANCELLED, progress=dict(progress))
+                    logger.info("%s: cancelled job %s", worker, job_id)
+                elif task.exception():
+                    error = f"{type(task.exception()).__name__}: {task.exception()}"
+                    await asyncio.to_thread(queue.finish, job_id, worker, ERROR, error=error, progress=dict(progress))
+                    logger.warning("%s: job %s failed: %s", worker, job_id, error)
+                else:
+                    await asyncio.to_thread(queue.finish, job_id, worker, DONE, result=task.result(), progress=dict(progress))
+                    logger.info("%s: finished job %s", worker, job_id)
+            elif await asyncio.to_thread(queue.report, job_id, worker, dict(progress)):
+                task.cancel()
+
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued pipeline jobs for one app.")
+    parser.add_argument("app", help="app folder, e.g. Code-Review-Assistant")
+    parser.add_argument(
+        "--concurrency", type=int, default=int(os.getenv("JOB_CONCURRENCY", "4")),
+        help="jobs this process runs at the same time (default: JOB_CONCURRENCY or 4)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    load_app(args.app)
+    from .connection import run_async
+    from .jobs import get_queue
+    from .metrics import metrics
+
+    # SIGTERM (e.g. from a container runtime) stops the worker like Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    running = {}
+    try:
+        # Jobs are filed under the app name its connection.py gives shared.metrics
+        run_async(work(metrics.app, args.concurrency, worker, running))
+    except KeyboardInterrupt:
+        # Unfinished jobs go back to the queue for another worker
+        for job_id in list(running):
+            get_queue().requeue(job_id, worker)
+        logger.info("%s: stopped, requeued %s jobs", worker, len(running))
+
+
+if __name__ == "__main__":
+    main()
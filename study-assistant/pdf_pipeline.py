@@ -0,0 +1,130 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from agents import Agent
+from connection import config, run_agent, dispatch
+from shared.models import model_registry
+from shared.tokens import estimate_tokens
+
+# ---------- SETTINGS ----------
+CHUNK_TOKENS = int(os.getenv("PDF_CHUNK_TOKENS", "3000"))
+REDUCE_TOKENS = int(os.getenv("PDF_REDUCE_TOKENS", "6000"))
+MAX_PARALLEL = int(os.getenv("PDF_MAX_PARALLEL", "4"))
+MAX_REDUCE_ROUNDS = 3
+
+# ---------- AGENTS ----------
+chunk_summary_agent = Agent(
+    name="Notes Condenser",
+    instructions="""
+Tumhe lecture notes ka ek hissa milega. Is hisse ke important topics aur subtopics
+short bullet points mein likho, taake baad mein in se study plan banaya ja sake.
+Koi intro ya explanation mat do, sirf bullet points.
+""",
+)
+# Many small extraction calls per PDF: the fast tier (see shared/models.py)
+model_registry.set_tier(chunk_summary_agent.name, "fast")
+
+# ---------- EXTRACTION ----------
+def iter_pages(path):
+    # PyMuPDF reads pages from disk one at a time, so the whole PDF is never
+    # held in memory
+    import fitz  # PyMuPDF, imported here so only the PDF path pays for it
+
+    with fitz.open(path) as pdf_reader:
+        for page in pdf_reader:
+            yield page.get_text()
+
+def split_oversized(text, max_tokens):
+    # A single page bigger than the budget is split on line boundaries
+    piece, size = [], 0
+    for line in text.splitlines():
+        tokens = estimate_tokens(line)
+        if piece and size + tokens > max_tokens:
+            yield "\n".join(piece)
+            piece, size = [], 0
+        piece.append(line)
+        size += tokens
+    if piece:
+        yield "\n".join(piece)
+
+def iter_chunks(texts, max_tokens=CHUNK_TOKENS):
+    chunk, size = [], 0
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        for part in split_oversized(text, max_tokens):
+            tokens = estimate_tokens(part)
+            if chunk and size + tokens > max_tokens:
+                yield "\n".join(chunk)
+                chunk, size = [], 0
+            chunk.append(part)
+            size += tokens
+    if chunk:
+        yield "\n".join(chunk)
+
+# ---------- MAP / REDUCE ----------
+async def summarize_chunks(chunks, on_progress=None):
+    # At most MAX_PARALLEL chunks are extracted and in flight at once, so
+    # memory scales with the chunk size rather than the document size.
+    # PyMuPDF objects aren't thread-safe, so chunks are read on one dedicated
+    # thread. The first chunk that fails cancels the others and stops reading.
+    loop = asyncio.get_running_loop()
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-reader")
+    summaries = []
+    pending = set()
+    done = 0
+
+    async def summarize(i, chunk):
+        nonlocal done
+        summaries[i] = await run_agent(chunk_summary_agent, [{"role": "user", "content": chunk}], config)
+        done += 1
+        if on_progress:
+            dispatch(on_progress, done)
+
+    async def collect(wait):
+        # Raises the error of a failed chunk, if any has finished
+        nonlocal pending
+        if wait:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        else:
+            finished = {task for task in pending if task.done()}
+            pending -= finished
+        for task in finished:
+            task.result()
+
+    try:
+        while True:
+            await collect(wait=len(pending) >= MAX_PARALLEL)
+            # PDF parsing is blocking, keep it off the event loop
+            chunk = await loop.run_in_executor(reader, next, chunks, None)
+            if chunk is None:
+                break
+            summaries.append(None)
+            pending.add(asyncio.create_task(summarize(len(summaries) - 1, chunk)))
+        while pending:
+            await collect(wait=True)
+        return summaries
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # A page generator closes its document on the thread that read it
+        if hasattr(chunks, "close"):
+            reader.submit(chunks.close)
+        reader.shutdown(wait=False)
+
+async def reduce_summaries(summaries, on_progress=None):
+    rounds = 0
+    while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > REDUCE_TOKENS and rounds < MAX_REDUCE_ROUNDS:
+        groups = iter_chunks(summaries, REDUCE_TOKENS)
+        summaries = await summarize_chunks(groups, on_progress)
+        rounds += 1
+    return "\n\n".join(summaries)
+
+async def condense_pdf(path, on_progress=None):
+    # Returns condensed notes small enough for a single scheduler prompt
+    chunks = iter_chunks(iter_pages(path))
+    summaries = await summarize_chunks(chunks, on_progress)
+    return await reduce_summaries(list(summaries), on_progress)
@@ -0,0 +1,124 @@
+import os
+from agents import Agent
+from pydantic import BaseModel
+from connection import config, dispatch, run_agent
+from shared.models import model_registry
+from shared.output_schema import RepairingOutputSchema
+from shared.tokens import token_budget
+
+# ---------- SCHEMAS ----------
+class Resource(BaseModel):
+    title: str
+    url: str
+
+class Resources(BaseModel):
+    resources: list[Resource]
+
+# ---------- AGENTS ----------
+scheduler_agent = Agent(
+    name="Study Scheduler",
+    instructions="""
+Tum ek intelligent study planner ho. User tumhe ek raw text (notes ya PDF content) aur deadline dega.
+Tum is text se important topics aur subtopics identify karo.
+Fir unke basis par ek daily study plan banao jo deadline ke andar complete ho jaye.
+
+Format:
+Day 1: Topic/Subtopic
+- [Resource Title](https://example.com)
+Day 2: ...
+""",
+)
+
+research_agent = Agent(
+    name="Web Researcher",
+    instructions="""
+Tumhare paas topic hoga, tum uske liye 3-5 trusted online resources dhundo (Coursera, Google ML, FastAI, Kaggle, etc).
+Sirf academic ya trusted sources ke links do. Non-academic ya promotional sites ko exclude karo.
+
+Har resource ka sirf title aur full https URL do, koi description ya extra text nahi.
+""",
+    output_type=RepairingOutputSchema(Resources),
+)
+
+summarizer_agent = Agent(
+    name="Content Summarizer",
+    instructions="""
+Tum research content ko summarize karo concise academic tone mein.
+Maximum 100 words mein output do.
+""",
+)
+
+# Input caps in tokens (see shared/tokens.py). Notes over the cap keep their
+# headings and the first lines of each section; PDFs are condensed to about
+# PDF_REDUCE_TOKENS before they get here.
+token_budget.set_cap(scheduler_agent.name, 6000)
+# The researcher only needs to know what the notes are about
+token_budget.set_cap(research_agent.name, 300)
+
+# Model tiers (see shared/models.py). A short summary and a link list don't
+# need the stronger model; the research list moves up a tier if its output
+# fails validation.
+model_registry.set_tier(summarizer_agent.name, "fast")
+model_registry.set_tier(research_agent.name, "fast")
+
+# ---------- PIPELINES ----------
+def stream_to(key, on_text):
+    return (lambda text: on_text(key, text)) if on_text else None
+
+def resources_markdown(resources):
+    return "\n".join(f"- [{r.title}]({r.url})" for r in resources.resources if r.url.startswith(("http://", "https://")))
+
+async def find_resources(query, on_text=None):
+    # Structured output doesn't stream; the rendered list is shown once complete
+    resources = await run_agent(research_agent, [{"role": "user", "content": query}], config)
+    research = resources_markdown(resources)
+    if on_text:
+        dispatch(on_text, "research", research)
+    return research
+
+async def run_agents_with_text(raw_text, deadline, on_text=None):
+    # The deadline is its own message so trimming the notes can't drop it
+    user_prompt = [
+        {"role": "user", "content": f"Yeh notes hai:\n{raw_text}"},
+        {"role": "user", "content": f"Deadline: {deadline}"},
+    ]
+
+    plan = await run_agent(scheduler_agent, user_prompt, config, on_text=stream_to("plan", on_text))
+    research = await find_resources(raw_text, on_text)
+    summary = await run_agent(summarizer_agent, [{"role": "user", "content": research}], config, on_text=stream_to("summary", on_text))
+    return plan, research, summary
+
+async def run_agents_with_topic(topic_text, deadline, on_text=None):
+    user_prompt = f"Topic: {topic_text}\nDeadline: {deadline}"
+
+    plan = await run_agent(scheduler_agent, [{"role": "user", "content": user_prompt}], config, on_text=stream_to("plan", on_text))
+    research = await find_resources(topic_text, on_text)
+    summary = await run_agent(summarizer_agent, [{"role": "user", "content": research}], config, on_text=stream_to("summary", on_text))
+    return plan, research, summary
+
+# ---------- JOBS ----------
+# Deadlines travel as ISO dates, which format the same in prompts
+async def topic_plan_job(input, on_text=None):
+    plan, research, summary = await run_agents_with_topic(input["topic"], input["deadline"], on_text)
+    return {"plan": plan, "research": research, "summary": summary}
+
+async def text_plan_job(input, on_text=None):
+    plan, research, summary = await run_agents_with_text(input["text"], input["deadline"], on_text)
+    return {"plan": plan, "research": research, "summary": summary}
+
+async def condense_pdf_job(input, on_text=None):
+    # input["pdf"] is a path from save_upload. The file is removed once the
+    # job finishes or fails, but not when it's cancelled: a stopped worker's
+    # jobs go back to the queue and need it again.
+    from pdf_pipeline import condense_pdf
+
+    on_progress = (lambda done: on_text("sections", str(done))) if on_text else None
+    try:
+        notes = await condense_pdf(input["pdf"], on_progress)
+    except Exception:
+        os.unlink(input["pdf"])
+        raise
+    os.unlink(input["pdf"])
+    return {"notes": notes}
+
+JOB_HANDLERS = {"topic_plan": topic_plan_job, "text_plan": text_plan_job, "condense_pdf": condense_pdf_job}
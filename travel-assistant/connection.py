@@ -1,32 +1,27 @@
 from dotenv import load_dotenv
-import os 
-from agents import RunConfig , OpenAIChatCompletionsModel , AsyncOpenAI, set_tracing_disabled 
+import os
+import sys
 
+# Loads this app's .env before the shared connection reads API_KEY
 load_dotenv()
-set_tracing_disabled(True)
-
-
-api_key = os.getenv("API_KEY")
-# Check if the API key is present; if not, raise an error
-if not api_key:
-    raise ValueError("API_KEY is not set. Please ensure it is defined in your .env file.")
-
-#Reference: https://ai.google.dev/gemini-api/docs/openai
-external_client = AsyncOpenAI(
-    api_key= api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
-
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
-
-config = RunConfig(
-    model=model,
-    model_provider=external_client,
-    tracing_disabled=True
-)
-
-
 
+# The client, model and run config live in the shared package at the repo root
+# so all apps reuse one event loop and one keep-alive HTTP pool.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.connection import run_async, dispatch, pool_stats
+from shared.cache import agent_cache
+from shared.jobs import run_job
+from shared.metrics import metrics
+from shared.session import restore_session, save_session
+from shared.startup import preload
+
+# Tags every recorded agent run with this app's folder name
+metrics.app = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+def __getattr__(name):
+    if name == "run_agent":
+        from shared.runner import run_agent
+        return run_agent
+    import shared.connection
+    return getattr(shared.connection, name)
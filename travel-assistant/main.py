@@ -1,67 +1,16 @@
 import streamlit as st
-import asyncio
-from agents import Agent, Runner
-from connection import config
+from connection import preload, run_job, restore_session, save_session
 
-# ------------------- AGENTS -------------------
-
-destination_agent = Agent(
-    name="Destination Agent",
-    instructions="""
-    You are an expert travel guide assistant. Based on the user's selected country, cities, group type (solo, friends, family), and trip duration, recommend top tourist attractions for each city.
-
-    Focus on:
-    - Cultural or historical importance
-    - Popularity among travelers
-    - Suitability for the selected group type
-    - Safety and overall experience
-
-    Format your response in Markdown. Provide the city's name in bold followed by bullet-pointed attractions. Mention why each place is worth visiting in 1 line.
-
-    Example:
-
-    **Paris**
-    - Eiffel Tower: Iconic landmark, ideal for panoramic views and photos
-    - Louvre Museum: World-renowned museum, perfect for art and history lovers
-
-    **Nice**
-    - Promenade des Anglais: Scenic seaside walkway, ideal for families and evening strolls
-
-    Budget or cost details are **not required**.
-    """
-)
-
-
-
-budget_agent = Agent(
-    name="Budget Agent",
-    instructions="""
-    You are a travel budget assistant. Estimate the cost of a trip based **only on local travel** (within the selected country), including transportation between cities, local accommodation, meals, and attractions.
-
-    Never assume international flights unless explicitly mentioned. Use realistic local pricing.
-
-    Format:
-    - Local Transport: $...
-    - Hotel: $...
-    - Food: $...
-    - Activities: $...
-    - Total: $...
-    - Comment: Within/Over Budget + suggestion if over
-    """
-)
-
-qa_agent = Agent(
-    name="Q&A Agent",
-    instructions="""
-    You are a helpful travel assistant. Answer follow-up questions about the user's planned trip using the provided trip summary and context. Be concise, accurate, and friendly. If you don't know the answer, say so.
-    """
-)
+preload("pipeline")
 
 # ------------------- STREAMLIT CONFIG -------------------
 
 st.set_page_config(page_title="✈️ AI Travel Planner")
 st.title("✈️ AI-Powered Travel Planner")
 
+# The planned trip and follow-ups survive refreshes and reconnects (see ?sid= in the URL)
+restore_session()
+
 # ------------------- INPUT FORM -------------------
 
 country = st.text_input("🌍 Enter Country")
@@ -79,6 +28,15 @@ duration = st.slider("📅 Duration (in days)", 1, 30, 5)
 budget = st.number_input("💰 Total Budget (USD)", min_value=100)
 submit = st.button("🧳 Plan My Trip")
 
+trip = {
+    "country": country,
+    "cities": cities,
+    "travel_type": travel_type,
+    "group_size": group_size,
+    "duration": duration,
+    "budget": budget,
+}
+
 # ------------------- SESSION STATE -------------------
 
 if "trip_summary" not in st.session_state:
@@ -88,56 +46,49 @@ if "trip_done" not in st.session_state:
 if "qna_list" not in st.session_state:
     st.session_state.qna_list = []
 
-# ------------------- AGENT RUNNER -------------------
-
-async def run_agents():
-    user_context = f"""
-    Country: {country}
-    Cities: {', '.join(cities)}
-    Travel Type: {travel_type}
-    Group Size: {group_size}
-    Trip Duration: {duration} days
-    Budget: ${budget}
-    """
-
-    dest_response = await Runner.run(
-        starting_agent=destination_agent,
-        input=[{"role": "user", "content": user_context}],
-        run_config=config
-    )
-
-    budget_prompt = f"""
-    Trip Destinations:\n{dest_response.final_output}
-    Country: {country}
-    Duration: {duration} days
-    Group: {group_size} ({travel_type})
-    Budget Limit: ${budget}
-    """
-
-    budget_response = await Runner.run(
-        starting_agent=budget_agent,
-        input=[{"role": "user", "content": budget_prompt}],
-        run_config=config
-    )
-
-    st.session_state.trip_summary = user_context
-    return dest_response.final_output, budget_response.final_output
-
 # ------------------- DISPLAY RESULTS -------------------
 
+just_planned = False
 if submit:
     if not country or not cities:
         st.warning("Please enter country and at least one city.")
     else:
-        with st.spinner("Planning your trip with agents..."):
-            dest_out, budget_out = asyncio.run(run_agents())
-            st.session_state.trip_done = True
-            st.session_state.dest_out = dest_out
-            st.session_state.budget_out = budget_out
+        from memory import new_memory
+        from pipeline import build_user_context
+
+        trip_summary = build_user_context(trip)
+
+        st.subheader("📋 Trip Summary")
+        st.markdown(trip_summary)
+
+        panels = {}
+        st.subheader("📍 Recommended Attractions")
+        panels["dest"] = st.empty()
+        panels["dest"].info("Planning your trip with agents...")
+
+        st.subheader("💰 Estimated Budget")
+        panels["budget"] = st.empty()
+
+        result = run_job("plan", trip, on_text=lambda key, text: panels[key].markdown(text))
+        dest_out, budget_out = result["dest"], result["budget"]
+        panels["dest"].markdown(dest_out)
+        panels["budget"].markdown(budget_out)
+
+        save_session(
+            trip_summary=trip_summary,
+            trip_done=True,
+            dest_out=dest_out,
+            budget_out=budget_out,
+            # Follow-ups remember this plan and every earlier answer about it
+            memory=new_memory(trip_summary, dest_out, budget_out),
+            qna_list=st.session_state.qna_list,
+        )
+        just_planned = True
 
 # ------------------- SHOW PLANNED TRIP IF EXISTS -------------------
 
-if st.session_state.trip_done:
+# A trip planned in this run has already been streamed onto the page above
+if st.session_state.trip_done and not just_planned:
     st.subheader("📋 Trip Summary")
     st.markdown(st.session_state.trip_summary)
 
@@ -153,20 +104,20 @@ if st.session_state.trip_done:
     st.subheader("🤔 Got more questions about your trip?")
     follow_up = st.text_input("Ask a follow-up question about your plan...")
 
-    if follow_up:
-        with st.spinner("Thinking..."):
-            async def answer_question():
-                return await Runner.run(
-                    starting_agent=qa_agent,
-                    input=[{
-                        "role": "user",
-                        "content": f"{follow_up}\n\nTrip Info:\n{st.session_state.trip_summary}"
-                    }],
-                    run_config=config
-                )
-
-            followup_result = asyncio.run(answer_question())
-            st.session_state.qna_list.append((follow_up, followup_result.final_output))
+    # Reruns keep the last question in the box; only answer a new one, so it isn't added to memory twice
+    if follow_up and follow_up != st.session_state.get("last_follow_up"):
+        answer_box = st.empty()
+        answer_box.info("Thinking...")
+        result = run_job(
+            "follow_up",
+            {"question": follow_up, "memory": st.session_state.memory},
+            on_text=lambda key, text: answer_box.markdown(text),
+        )
+        st.session_state.qna_list.append((follow_up, result["answer"]))
+        # The job returns the memory with this turn added
+        save_session(last_follow_up=follow_up, qna_list=st.session_state.qna_list, memory=result["memory"])
+        # The answer is shown again in the list below
+        answer_box.empty()
 
     if st.session_state.qna_list:
         st.subheader("💬 Follow-up Answers")
@@ -0,0 +1,87 @@
+import os
+from agents import Agent
+from connection import config, run_agent
+from shared.models import model_registry
+from shared.tokens import estimate_tokens
+
+# ------------------- SETTINGS -------------------
+
+# Most recent follow-up turns kept word for word after a compaction
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+# Turns that pile up on top of those before the oldest are summarized in one
+# call, so the summarizer runs once per batch instead of on every follow-up
+MEMORY_COMPACT_BATCH = int(os.getenv("MEMORY_COMPACT_BATCH", "4"))
+# Token budget for the verbatim turns; going over it also starts a compaction
+MEMORY_HISTORY_TOKENS = int(os.getenv("MEMORY_HISTORY_TOKENS", "1200"))
+# Rough size the rolling summary is asked to stay under
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "250"))
+
+# ------------------- AGENT -------------------
+
+summary_agent = Agent(
+    name="Conversation Summarizer",
+    instructions=f"""
+    You keep a running summary of a conversation between a traveller and a travel assistant about a planned trip.
+
+    You get the current summary (it may be empty) and some newer question/answer turns. Merge them into one updated summary.
+
+    Keep facts the traveller stated (preferences, dates, constraints, changes to the plan) and the assistant's concrete recommendations, prices and decisions. Drop greetings and repetition.
+
+    Write plain bullet points, at most about {MEMORY_SUMMARY_TOKENS} tokens. Only return the summary.
+    """
+)
+# Folding old turns into a summary is light work: the fast tier (see shared/models.py)
+model_registry.set_tier(summary_agent.name, "fast")
+
+# ------------------- MEMORY -------------------
+
+# A memory is a plain dict so it can live in session state:
+#   plan    - trip summary plus the destination and budget answers; never changes,
+#             so every follow-up starts with the same prompt prefix
+#   summary - rolling summary of turns that were compacted away
+#   turns   - recent [question, answer] pairs, kept verbatim
+
+def new_memory(trip_summary, dest, budget):
+    plan = f"""
+    Trip Info:\n{trip_summary}
+    Recommended Attractions:\n{dest}
+    Estimated Budget:\n{budget}
+    """
+    return {"plan": plan, "summary": "", "turns": []}
+
+def build_input(memory, question):
+    # Stable part first (plan), then the summary, then recent turns, then the new question
+    items = [{"role": "user", "content": memory["plan"]}]
+    if memory["summary"]:
+        items.append({"role": "user", "content": f"Summary of our earlier conversation:\n{memory['summary']}"})
+    for q, a in memory["turns"]:
+        items.append({"role": "user", "content": q})
+        items.append({"role": "assistant", "content": a})
+    items.append({"role": "user", "content": question})
+    return items
+
+def history_tokens(turns):
+    return sum(estimate_tokens(q) + estimate_tokens(a) for q, a in turns)
+
+async def compact(memory):
+    # Nothing happens (and the stored summary is reused) until there are more
+    # than MEMORY_RECENT_TURNS + MEMORY_COMPACT_BATCH turns or they go over
+    # MEMORY_HISTORY_TOKENS. Then the oldest turns are folded into the summary
+    # in one call, down to MEMORY_RECENT_TURNS and half the token budget, so
+    # the next few follow-ups don't need another. The newest turn is always kept.
+    turns = list(memory["turns"])
+    if len(turns) <= MEMORY_RECENT_TURNS + MEMORY_COMPACT_BATCH and history_tokens(turns) <= MEMORY_HISTORY_TOKENS:
+        return
+    old = []
+    while len(turns) > 1 and (len(turns) > MEMORY_RECENT_TURNS or history_tokens(turns) > MEMORY_HISTORY_TOKENS // 2):
+        old.append(turns.pop(0))
+    if not old:
+        return
+
+    transcript = "\n\n".join(f"Q: {q}\nA: {a}" for q, a in old)
+    prompt = f"Current summary:\n{memory['summary'] or '(empty)'}\n\nNewer turns:\n{transcript}"
+    summary = await run_agent(summary_agent, [{"role": "user", "content": prompt}], config)
+
+    # Only drop the turns once their summary exists
+    memory["summary"] = summary
+    memory["turns"] = turns
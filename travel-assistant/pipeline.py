@@ -0,0 +1,317 @@
+import asyncio
+import json
+import os
+import re
+from agents import Agent
+from pydantic import BaseModel
+from connection import config, run_agent, dispatch
+from memory import build_input, compact
+from shared.models import model_registry
+from shared.output_schema import RepairingOutputSchema
+from shared.tokens import token_budget
+from shared.connection import MAX_CONNECTIONS
+from shared.ratelimit import limiter
+from shared.semantic_cache import SemanticCache
+
+# Set TRAVEL_FANOUT=0 to plan all cities in one destination call and one budget call
+TRAVEL_FANOUT = os.getenv("TRAVEL_FANOUT", "1") != "0"
+
+# Model calls that trips being planned in this process may have open at once
+_in_flight = 0
+
+# Words that don't change what a follow-up question asks
+QUESTION_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "for", "in", "on", "at", "by", "and", "or",
+    "do", "does", "did", "can", "could", "should", "would", "will", "i", "me", "my", "we", "our", "us",
+    "you", "your", "it", "this", "that", "there", "what", "which", "please", "any", "some",
+    "how", "when", "with",
+}
+# Words that make a follow-up lean on earlier turns: "how much does that cost?",
+# "what about the second day?"
+REFERS_BACK = {
+    "that", "this", "it", "its", "those", "these", "them", "they", "there", "then", "one", "ones",
+    "same", "also", "else", "instead", "other", "another", "again", "more", "about",
+    "first", "second", "third", "last", "next", "previous", "earlier", "before", "after",
+}
+
+# ------------------- AGENTS -------------------
+
+destination_agent = Agent(
+    name="Destination Agent",
+    instructions="""
+    You are an expert travel guide assistant. Based on the user's selected country, cities, group type (solo, friends, family), and trip duration, recommend top tourist attractions for each city.
+
+    Focus on:
+    - Cultural or historical importance
+    - Popularity among travelers
+    - Suitability for the selected group type
+    - Safety and overall experience
+
+    Format your response in Markdown. Provide the city's name in bold followed by bullet-pointed attractions. Mention why each place is worth visiting in 1 line.
+
+    Example:
+
+    **Paris**
+    - Eiffel Tower: Iconic landmark, ideal for panoramic views and photos
+    - Louvre Museum: World-renowned museum, perfect for art and history lovers
+
+    **Nice**
+    - Promenade des Anglais: Scenic seaside walkway, ideal for families and evening strolls
+
+    Budget or cost details are **not required**.
+    """
+)
+
+
+
+class BudgetEstimate(BaseModel):
+    # USD for the whole group and stay; the total and the within/over verdict
+    # are worked out locally (budget_markdown)
+    local_transport: float
+    hotel: float
+    food: float
+    activities: float
+    suggestion: str
+
+budget_agent = Agent(
+    name="Budget Agent",
+    instructions="""
+    You are a travel budget assistant. Estimate the cost of a trip based **only on local travel** (within the selected country), including transportation between cities, local accommodation, meals, and attractions.
+
+    Never assume international flights unless explicitly mentioned. Use realistic local pricing.
+
+    Give each cost in USD as one number (the midpoint if you would give a range).
+    suggestion: one short sentence on how to save money if the total is over the budget limit, otherwise "".
+    """,
+    output_type=RepairingOutputSchema(BudgetEstimate),
+)
+
+qa_agent = Agent(
+    name="Q&A Agent",
+    instructions="""
+    You are a helpful travel assistant. Answer follow-up questions about the user's planned trip using the provided trip info, recommendations, budget and the earlier conversation. Be concise, accurate, and friendly. If you don't know the answer, say so.
+    """
+)
+
+# The budget agent gets the destination markdown; over the cap each city keeps
+# its heading and its first attractions (see shared/tokens.py)
+token_budget.set_cap(budget_agent.name, 1200)
+# Four numbers and a sentence: the fast tier, moving up a tier when the
+# estimate fails validation (see shared/models.py)
+model_registry.set_tier(budget_agent.name, "fast")
+
+# ------------------- AGENT RUNNER -------------------
+
+# trip is a dict with country, cities, travel_type, group_size, duration and budget
+def build_user_context(trip):
+    return f"""
+    Country: {trip["country"]}
+    Cities: {', '.join(trip["cities"])}
+    Travel Type: {trip["travel_type"]}
+    Group Size: {trip["group_size"]}
+    Trip Duration: {trip["duration"]} days
+    Budget: ${trip["budget"]}
+    """
+
+def budget_input(destinations, trip_facts):
+    # Separate messages so trimming to the budget agent's cap only ever
+    # shortens the destinations, never the budget limit
+    return [
+        {"role": "user", "content": f"Trip Destinations:\n{destinations}"},
+        {"role": "user", "content": trip_facts},
+    ]
+
+async def run_agents(trip, on_text=None):
+    # on_text(key, text) receives streamed tokens for "dest"; the structured
+    # budget estimate is sent to it rendered, once complete.
+    # Each leg makes two calls in a row, so with MODEL_RPM set, the rate
+    # limiter's minute bounds how many legs are worth planning at once. The fan-out makes more calls
+    # in total than one pass; when other trips already fill the HTTP pool those
+    # extra calls would only queue behind them, so the trip is planned in one
+    # pass instead.
+    global _in_flight
+    legs = len(split_legs(trip["cities"], trip["duration"]))
+    width = legs if limiter.requests.unlimited else min(legs, max(1, int(limiter.requests.per_minute // 2)))
+    fan_out = TRAVEL_FANOUT and width > 1 and _in_flight + width <= MAX_CONNECTIONS
+    calls = width if fan_out else 1
+    _in_flight += calls
+    try:
+        if fan_out:
+            return await run_agents_per_city(trip, on_text, width)
+        return await run_agents_in_one_pass(trip, on_text)
+    finally:
+        _in_flight -= calls
+
+async def run_agents_in_one_pass(trip, on_text=None):
+    user_context = build_user_context(trip)
+    dest_response = await run_agent(
+        destination_agent,
+        [{"role": "user", "content": user_context}],
+        config,
+        on_text=(lambda text: on_text("dest", text)) if on_text else None,
+    )
+
+    budget_prompt = f"""
+    Country: {trip["country"]}
+    Duration: {trip["duration"]} days
+    Group: {trip["group_size"]} ({trip["travel_type"]})
+    Budget Limit: ${trip["budget"]}
+    """
+
+    # Structured output doesn't stream; the rendered estimate is shown once complete
+    estimate = await run_agent(budget_agent, budget_input(dest_response, budget_prompt), config)
+    budget_response = budget_markdown(estimate, trip["budget"])
+    if on_text:
+        dispatch(on_text, "budget", budget_response)
+
+    return dest_response, budget_response
+
+# ------------------- PER-CITY FAN-OUT -------------------
+
+BUDGET_LINES = {
+    "Local Transport": "local_transport",
+    "Hotel": "hotel",
+    "Food": "food",
+    "Activities": "activities",
+}
+
+def split_days(duration, count):
+    # 7 days over 3 legs -> [3, 2, 2]; count is at most duration
+    base, extra = divmod(duration, count)
+    return [base + (i < extra) for i in range(count)]
+
+def split_legs(cities, duration):
+    # [(cities, days)] in the order entered. Each city is a leg of its own
+    # while there are enough days; with fewer days than cities, neighbouring
+    # cities share a day (5 cities in 2 days -> 3 on day 1, 2 on day 2), so the
+    # legs never add up to more than the trip.
+    count = min(len(cities), duration)
+    base, extra = divmod(len(cities), count)
+    legs, start = [], 0
+    for days in split_days(duration, count):
+        size = base + (len(legs) < extra)
+        legs.append((cities[start:start + size], days))
+        start += size
+    return legs
+
+def budget_lines(amounts, limit, suggestion=""):
+    # amounts maps each BUDGET_LINES label to dollars
+    total = sum(amounts.values())
+    lines = [f"- {label}: ${amount:,.0f}" for label, amount in amounts.items()]
+    lines.append(f"- Total: ${total:,.0f}")
+    over = total - limit
+    if over > 0:
+        lines.append(f"- Comment: Over budget by ${over:,.0f}, {suggestion or 'consider fewer days or cheaper hotels'}")
+    else:
+        lines.append(f"- Comment: Within budget, ${-over:,.0f} to spare")
+    return "\n".join(lines)
+
+def budget_markdown(estimate, limit):
+    amounts = {label: getattr(estimate, field) for label, field in BUDGET_LINES.items()}
+    return budget_lines(amounts, limit, estimate.suggestion.strip().rstrip("."))
+
+def total_budget(trip, estimates):
+    # Adds up the per-city estimates locally instead of asking the model again
+    totals = {label: sum(getattr(estimate, field) for estimate in estimates) for label, field in BUDGET_LINES.items()}
+    return "**Trip Total**\n" + budget_lines(totals, trip["budget"], "consider fewer days in the most expensive city or cheaper hotels")
+
+async def run_agents_per_city(trip, on_text=None, width=None):
+    # One destination call and one budget call per leg (see split_legs), up to
+    # `width` legs at once, so a long itinerary takes about as long as a
+    # single city. Outputs are merged in the order the cities were entered.
+    legs = split_legs(trip["cities"], trip["duration"])
+    semaphore = asyncio.Semaphore(width or len(legs))
+    streamed = {"dest": [""] * len(legs), "budget": [""] * len(legs)}
+
+    def stream(key, i, header=""):
+        if not on_text:
+            return None
+        def update(text):
+            streamed[key][i] = header + text
+            on_text(key, "\n\n".join(part for part in streamed[key] if part))
+        return update
+
+    async def plan_city(i):
+        async with semaphore:
+            return await plan_leg(i)
+
+    async def plan_leg(i):
+        cities, days = legs[i]
+        place = ", ".join(cities)
+        share = round(trip["budget"] * days / trip["duration"])
+        leg = {**trip, "cities": cities, "duration": days, "budget": share}
+        dest = await run_agent(
+            destination_agent,
+            [{"role": "user", "content": build_user_context(leg)}],
+            config,
+            on_text=stream("dest", i),
+        )
+
+        if i + 1 < len(legs):
+            next_leg = f"Include local transport from {cities[-1]} to {legs[i + 1][0][0]}."
+        else:
+            next_leg = "This is the last stop."
+        budget_prompt = f"""
+    Country: {trip["country"]}
+    Duration: {days} days in {place}
+    Group: {trip["group_size"]} ({trip["travel_type"]})
+    Budget Limit: ${share}
+    {next_leg}
+    """
+        header = f"**{place}** ({days} {'day' if days == 1 else 'days'})\n"
+        estimate = await run_agent(budget_agent, budget_input(dest, budget_prompt), config)
+        budget = budget_markdown(estimate, share)
+        if on_text:
+            dispatch(stream("budget", i, header), budget)
+        return dest, header + budget, estimate
+
+    results = await asyncio.gather(*(plan_city(i) for i in range(len(legs))))
+
+    dest_response = "\n\n".join(dest for dest, _, _ in results)
+    sections = [section for _, section, _ in results]
+    total = total_budget(trip, [estimate for _, _, estimate in results])
+    budget_response = "\n\n".join(sections + [total])
+    return dest_response, budget_response
+
+# Answers reused when a reworded question comes in for the same trip plan
+qa_cache = SemanticCache("Q&A Answers", stopwords=QUESTION_STOPWORDS)
+
+def qa_scope(memory, question):
+    # A question that stands on its own is shared by everyone with the same
+    # plan, whatever they asked before. One that refers back, or has fewer
+    # than two words of its own, only matches the same conversation state:
+    # the plan, the running summary and the last turn.
+    words = re.findall(r"\w+", question.lower())
+    own = [word for word in words if word not in QUESTION_STOPWORDS]
+    if len(own) >= 2 and not REFERS_BACK.intersection(words):
+        return memory["plan"]
+    return json.dumps([memory["plan"], memory["summary"], memory["turns"][-1:]])
+
+async def answer_follow_up(follow_up, memory, on_text=None):
+    # memory comes from memory.new_memory() and is updated in place with this turn
+    scope = qa_scope(memory, follow_up)
+    answer = qa_cache.get(follow_up, scope)
+    if answer is None:
+        answer = await run_agent(qa_agent, build_input(memory, follow_up), config, on_text=on_text)
+        qa_cache.put(follow_up, answer, scope)
+    elif on_text:
+        dispatch(on_text, answer)
+    memory["turns"].append([follow_up, answer])
+    await compact(memory)
+    return answer
+
+# ------------------- JOBS -------------------
+
+async def plan_job(input, on_text=None):
+    # input is the trip dict
+    dest, budget = await run_agents(input, on_text)
+    return {"dest": dest, "budget": budget}
+
+async def follow_up_job(input, on_text=None):
+    # The updated memory comes back with the answer
+    memory = input["memory"]
+    stream = (lambda text: on_text("answer", text)) if on_text else None
+    answer = await answer_follow_up(input["question"], memory, on_text=stream)
+    return {"answer": answer, "memory": memory}
+
+JOB_HANDLERS = {"plan": plan_job, "follow_up": follow_up_job}